@@ -1,13 +1,58 @@
 # backend/app/api/nowcasting.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.config import settings
 from app.database import sync_predictions_collection
-from app.schemas.prediction import StormCellLocation, NowcastResponse
+from app.schemas.prediction import (
+    StormCellLocation, NowcastResponse, OnDemandNowcastRequest, OnDemandNowcastResponse, OnDemandCellPrediction
+)
+from app.services.data_preprocessing import classify_mcs_types
 from datetime import datetime, timedelta
 from typing import List
+import numpy as np
 import json
 
 router = APIRouter()
 
+@router.post("/on-demand", response_model=OnDemandNowcastResponse)
+async def nowcast_on_demand(nowcast_request: OnDemandNowcastRequest, request: Request):
+    """
+    Nowcasts user-submitted storm cells. Concurrent requests are coalesced by
+    the micro-batcher, so a burst of callers shares a few batched model calls.
+    """
+    if settings.API_ONLY_MODE:
+        raise HTTPException(status_code=503, detail="On-demand nowcasting is not served by API-only workers.")
+    if nowcast_request.forecast_time not in ["30min", "60min"]:
+        raise HTTPException(status_code=400, detail="Invalid forecast_time. Use '30min' or '60min'.")
+    if not nowcast_request.cells:
+        return OnDemandNowcastResponse(forecast_time=nowcast_request.forecast_time, predictions=[])
+
+    features = np.empty((len(nowcast_request.cells), len(settings.RADAR_VARIABLES)), dtype=np.float32)
+    for row, cell in enumerate(nowcast_request.cells):
+        missing = [name for name in settings.RADAR_VARIABLES if name not in cell.features]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Cell {row} is missing features: {missing}")
+        features[row] = [cell.features[name] for name in settings.RADAR_VARIABLES]
+
+    derived_types = classify_mcs_types(features)
+    mcs_types = np.array([cell.mcs_type or derived for cell, derived in zip(nowcast_request.cells, derived_types)])
+    unknown = sorted(set(mcs_types) - set(settings.MCS_TYPES))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown MCS types: {unknown}")
+
+    results = await request.app.state.nowcast_batcher.submit(features, mcs_types, nowcast_request.forecast_time)
+
+    predictions = [
+        OnDemandCellPrediction(
+            cell_id=cell.cell_id,
+            mcs_type=str(mcs_type),
+            storm_cell_predicted=bool(is_storm_cell),
+            predicted_mean_rain_rate=None if np.isnan(mean_rr) else float(mean_rr),
+            predicted_top_10_rain_rate=None if np.isnan(top10_rr) else float(top10_rr),
+        )
+        for cell, mcs_type, (is_storm_cell, mean_rr, top10_rr) in zip(nowcast_request.cells, mcs_types, results)
+    ]
+    return OnDemandNowcastResponse(forecast_time=nowcast_request.forecast_time, predictions=predictions)
+
 @router.get("/{forecast_time}", response_model=NowcastResponse)
 async def get_nowcast_predictions(forecast_time: str):
     """
@@ -1,5 +1,5 @@
 # backend/app/api/training.py
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, status
 from fastapi.responses import JSONResponse
 import os
 import shutil
@@ -12,7 +12,8 @@ import io
 import asyncio
 from app.database import sync_datasets_collection, sync_training_status_collection
 from app.api.auth import get_current_admin_user
-from app.services.ml_service import MLModelService
+from app.services.training_worker import training_manager
+from app.services.feature_store import convert_to_columnar
 from app.config import settings
 from pydantic import BaseModel
 from bson import ObjectId
@@ -37,26 +38,63 @@ def validate_file_extension(filename: str, file_type: str) -> bool:
     ext = os.path.splitext(filename)[1].lower()
     return ext in ALLOWED_EXTENSIONS.get(file_type, [])
 
-async def run_real_training(training_id: str):
-    """Runs the real model training in the background."""
+# Background conversions in flight, by dataset id (this also keeps the tasks referenced)
+_conversion_tasks: Dict[str, asyncio.Task] = {}
+
+async def build_columnar_dataset(dataset_id: str, file_path: str) -> dict:
+    """Converts an upload into the columnar feature store and records its schema and row count."""
+    try:
+        columnar = await asyncio.to_thread(convert_to_columnar, file_path)
+        update = {"columnar_status": "ready", "columnar_error": None, **columnar}
+        logger.info(f"Dataset {dataset_id}: {columnar['row_count']} rows stored at {columnar['columnar_path']}")
+    except Exception as e:
+        logger.error(f"Dataset {dataset_id}: columnar conversion of {file_path} failed: {e}")
+        update = {"columnar_status": "failed", "columnar_error": str(e)}
+    sync_datasets_collection.update_one({"_id": ObjectId(dataset_id)}, {"$set": update})
+    return update
+
+def schedule_columnar_conversion(dataset_id: str, file_path: str) -> asyncio.Task:
+    task = _conversion_tasks.get(dataset_id)
+    if task is None:
+        task = asyncio.create_task(build_columnar_dataset(dataset_id, file_path))
+        _conversion_tasks[dataset_id] = task
+        task.add_done_callback(lambda _: _conversion_tasks.pop(dataset_id, None))
+    return task
+
+async def columnar_training_paths(datasets: List[Dict]) -> List[str]:
+    """
+    Feature store paths of the datasets. A conversion still in flight is
+    awaited; a dataset that was never converted (or whose copy is gone) is
+    converted now.
+    """
+    paths = []
+    for doc in datasets:
+        if doc.get("columnar_status") != "ready" or not os.path.exists(doc.get("columnar_path") or ""):
+            update = await schedule_columnar_conversion(str(doc["_id"]), doc["file_path"])
+            if update["columnar_status"] != "ready":
+                raise ValueError(f"Dataset {doc['filename']} could not be converted: {update['columnar_error']}")
+            doc.update(update)
+        paths.append(doc["columnar_path"])
+    return paths
+
+async def run_real_training(training_id: str, ml_service=None, full_retrain: bool = False):
+    """Runs the real model training in a worker process, keeping the API responsive."""
     try:
-        ml_service = MLModelService()
-        
         radar_data = list(sync_datasets_collection.find({"file_type": "radar_training_data"}))
         labels_data = list(sync_datasets_collection.find({"file_type": "training_labels"}))
         
-        radar_paths = [doc["file_path"] for doc in radar_data]
-        labels_paths = [doc["file_path"] for doc in labels_data]
+        radar_paths = await columnar_training_paths(radar_data)
+        labels_paths = await columnar_training_paths(labels_data)
         
-        ml_service.train_models(radar_paths, labels_paths)
-        
-        sync_training_status_collection.update_one(
-            {"_id": ObjectId(training_id)},
-            {"$set": {"status": "completed", "completed_at": datetime.utcnow()}}
-        )
-        print(f"Training {training_id} completed!")
+        final_status = await training_manager.run(training_id, radar_paths, labels_paths, full_retrain=full_retrain)
+
+        # Serve the new artifacts from this process too
+        if final_status == "completed" and ml_service is not None:
+            await asyncio.to_thread(ml_service.load_models)
+            ml_service.executor.recycle()
     except Exception as e:
         print(f"Training {training_id} failed: {e}")
+        training_manager.release()
         sync_training_status_collection.update_one(
             {"_id": ObjectId(training_id)},
             {"$set": {"status": "failed", "completed_at": datetime.utcnow(), "error_message": str(e)}}
@@ -91,10 +129,12 @@ async def upload_radar_training_data(
         "uploaded_by": current_user["email"],
         "uploaded_at": datetime.utcnow(),
         "file_size": os.path.getsize(file_path),
-        "status": "uploaded"
+        "status": "uploaded",
+        "columnar_status": "pending"
     }
     
     result = sync_datasets_collection.insert_one(dataset_doc)
+    schedule_columnar_conversion(str(result.inserted_id), file_path)
     
     return JSONResponse({
         "message": "Radar training data uploaded successfully",
@@ -131,10 +171,12 @@ async def upload_training_labels(
         "uploaded_by": current_user["email"],
         "uploaded_at": datetime.utcnow(),
         "file_size": os.path.getsize(file_path),
-        "status": "uploaded"
+        "status": "uploaded",
+        "columnar_status": "pending"
     }
     
     result = sync_datasets_collection.insert_one(dataset_doc)
+    schedule_columnar_conversion(str(result.inserted_id), file_path)
     
     return JSONResponse({
         "message": "Training labels uploaded successfully",
@@ -144,9 +186,21 @@ async def upload_training_labels(
 
 @router.post("/start-training")
 async def start_model_training(
+    request: Request,
+    full_retrain: bool = False,
     current_user = Depends(get_current_admin_user)
 ):
-    """Start the model training process"""
+    """Start the model training process (only keys whose data changed are retrained, unless full_retrain)"""
+    if settings.API_ONLY_MODE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Training is not available on API-only workers."
+        )
+    if training_manager.is_running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Training {training_manager.training_id} is already running."
+        )
     radar_data = list(sync_datasets_collection.find({"file_type": "radar_training_data"}))
     labels_data = list(sync_datasets_collection.find({"file_type": "training_labels"}))
     
@@ -161,13 +215,18 @@ async def start_model_training(
         "started_at": datetime.utcnow(),
         "started_by": current_user["email"],
         "radar_data_count": len(radar_data),
-        "labels_data_count": len(labels_data)
+        "labels_data_count": len(labels_data),
+        "full_retrain": full_retrain
     }
     
-    sync_training_status_collection.delete_many({})
+    # No await from the is_running check to reserve(), so two requests cannot both start a training
+    sync_training_status_collection.delete_many({"status": {"$ne": "training"}})
     result = sync_training_status_collection.insert_one(training_status)
+    training_manager.reserve(str(result.inserted_id))
     
-    asyncio.create_task(run_real_training(str(result.inserted_id)))
+    asyncio.create_task(run_real_training(
+        str(result.inserted_id), getattr(request.app.state, "ml_service", None), full_retrain
+    ))
     
     return JSONResponse({
         "message": "Model training started",
@@ -175,6 +234,23 @@ async def start_model_training(
         "status": "training"
     })
 
+@router.post("/cancel-training")
+async def cancel_model_training(
+    current_user = Depends(get_current_admin_user)
+):
+    """Cancel the running model training"""
+    training_id = training_manager.training_id
+    if not training_manager.cancel():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No training is running."
+        )
+    return JSONResponse({
+        "message": "Model training cancellation requested",
+        "training_id": training_id,
+        "status": "cancelling"
+    })
+
 @router.get("/training-status")
 async def get_training_status(
     current_user = Depends(get_current_admin_user)
@@ -275,6 +351,16 @@ async def delete_dataset(
         except Exception as e:
             logger.warning(f"Failed to delete file {dataset['file_path']}: {e}")
         
+        # The columnar copy is shared by uploads with the same content
+        columnar_path = dataset.get("columnar_path")
+        if columnar_path and os.path.exists(columnar_path) and sync_datasets_collection.count_documents(
+            {"content_hash": dataset.get("content_hash"), "_id": {"$ne": dataset["_id"]}}
+        ) == 0:
+            try:
+                os.remove(columnar_path)
+            except Exception as e:
+                logger.warning(f"Failed to delete columnar file {columnar_path}: {e}")
+        
         result = sync_datasets_collection.delete_one({"_id": ObjectId(dataset_id)})
         
         if result.deleted_count == 0:
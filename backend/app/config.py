@@ -28,6 +28,50 @@ class Settings:
 
     # ML Model Paths
     ML_MODELS_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml_models")
+    # Models are loaded on first use; at most this many (0 = unlimited) / this much artifact size stay resident
+    ML_MAX_RESIDENT_MODELS: int = int(os.getenv("ML_MAX_RESIDENT_MODELS", "12"))
+    ML_MAX_RESIDENT_MODEL_MB: float = float(os.getenv("ML_MAX_RESIDENT_MODEL_MB", "0"))
+    ML_PRELOAD_MODELS: bool = os.getenv("ML_PRELOAD_MODELS", "False").lower() == "true"
+    # Serve keras models from their exported NumPy weights (.npz) instead of TensorFlow
+    ML_NUMPY_INFERENCE: bool = os.getenv("ML_NUMPY_INFERENCE", "True").lower() == "true"
+    # API-only workers serve the HTTP API without ever importing the ML stack:
+    # no model loading, no nowcasting scheduler, no on-demand inference or training
+    API_ONLY_MODE: bool = os.getenv("API_ONLY_MODE", "False").lower() == "true"
+    # Startup warm-up: dummy batches of these sizes go through every model after loading
+    ML_WARMUP_ENABLED: bool = os.getenv("ML_WARMUP_ENABLED", "True").lower() == "true"
+    ML_WARMUP_BATCH_SIZES: list = [int(n) for n in os.getenv("ML_WARMUP_BATCH_SIZES", "1,32,256").split(",") if n.strip()]
+
+    # Per-row prediction cache (0 entries disables it); features are rounded to this many decimals for keying
+    PREDICTION_CACHE_MAX_ENTRIES: int = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "100000"))
+    PREDICTION_CACHE_TTL_S: float = float(os.getenv("PREDICTION_CACHE_TTL_S", "1800"))
+    PREDICTION_CACHE_DECIMALS: int = int(os.getenv("PREDICTION_CACHE_DECIMALS", "3"))
+
+    # Model grid training: parallel worker processes (0 = cores / threads per worker) and math threads per worker
+    TRAINING_MAX_WORKERS: int = int(os.getenv("TRAINING_MAX_WORKERS", "0"))
+    TRAINING_THREADS_PER_WORKER: int = int(os.getenv("TRAINING_THREADS_PER_WORKER", "2"))
+
+    # Training data is streamed in chunks of this many rows and staged on disk (empty = system temp dir)
+    TRAINING_CHUNK_ROWS: int = int(os.getenv("TRAINING_CHUNK_ROWS", "100000"))
+    TRAINING_STAGING_DIR: str = os.getenv("TRAINING_STAGING_DIR", "")
+    # Incremental retraining: skip keys whose training data is unchanged; optionally fine-tune
+    # the previous keras weights / Lasso coefficients of changed keys for fewer epochs
+    TRAINING_INCREMENTAL: bool = os.getenv("TRAINING_INCREMENTAL", "True").lower() == "true"
+    TRAINING_WARM_START: bool = os.getenv("TRAINING_WARM_START", "False").lower() == "true"
+    TRAINING_WARM_START_EPOCHS: int = int(os.getenv("TRAINING_WARM_START_EPOCHS", "5"))
+    # Columnar (Arrow IPC) copies of training uploads, named by content hash
+    FEATURE_STORE_DIR: str = os.getenv("FEATURE_STORE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "feature_store"))
+
+    # Inference executor ("thread" or "process") and its queue bound
+    INFERENCE_EXECUTOR: str = os.getenv("INFERENCE_EXECUTOR", "thread")
+    INFERENCE_MAX_WORKERS: int = int(os.getenv("INFERENCE_MAX_WORKERS", "2"))
+    INFERENCE_MAX_PENDING: int = int(os.getenv("INFERENCE_MAX_PENDING", "8"))
+    INFERENCE_QUEUE_TIMEOUT_S: float = float(os.getenv("INFERENCE_QUEUE_TIMEOUT_S", "30"))
+    # Event-loop lag sampling; lags above the warning threshold count as stalls
+    EVENT_LOOP_LAG_INTERVAL_S: float = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_S", "0.5"))
+    EVENT_LOOP_LAG_WARN_MS: float = float(os.getenv("EVENT_LOOP_LAG_WARN_MS", "100"))
+    # On-demand nowcasts are coalesced for up to this long / this many rows per batch
+    NOWCAST_BATCH_MAX_WAIT_MS: float = float(os.getenv("NOWCAST_BATCH_MAX_WAIT_MS", "5"))
+    NOWCAST_BATCH_MAX_ROWS: int = int(os.getenv("NOWCAST_BATCH_MAX_ROWS", "256"))
 
     # Heavy Rainfall Threshold
     HEAVY_RAINFALL_THRESHOLD_MM_H: float = float(os.getenv("HEAVY_RAINFALL_THRESHOLD_MM_H", "30.0")) # From paper [cite: 330]
@@ -36,6 +80,11 @@ class Settings:
     MCS_TYPES = ["CC", "MCC", "SLD", "SLP", "MSL", "ALL"]
     MCS_TYPES_REGRESSION = ["CC", "MSL"] # Based on paper's regression analysis [cite: 113]
 
+    # MCS categorization rules [cite: 89]
+    MCS_CC_MAX_RADIUS_KM: float = float(os.getenv("MCS_CC_MAX_RADIUS_KM", "20.0")) # [cite: 90]
+    MCS_LINEAR_AXIS_RATIO: float = float(os.getenv("MCS_LINEAR_AXIS_RATIO", "0.5"))
+    MCS_PARALLEL_MAX_ANGLE_DEG: float = float(os.getenv("MCS_PARALLEL_MAX_ANGLE_DEG", "45.0"))
+
     # Variables used in models (for reference in service)
     RADAR_VARIABLES = [
         "Rmj", "Rmn", "Theta", "MeanZ", "Area", "Volume", "Top", "Base",
@@ -47,13 +96,51 @@ class Settings:
         "dist_to_sea", "elevation", "aspect", "roughness", "slope"
     ] # From paper [cite: 133]
 
+    # Terrain rasters on the radar grid (.npy) and the derived, memory-mappable cache
+    TOPOGRAPHY_DEM_PATH: str = os.getenv("TOPOGRAPHY_DEM_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "topography", "dem.npy"))
+    TOPOGRAPHY_SEA_MASK_PATH: str = os.getenv("TOPOGRAPHY_SEA_MASK_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "topography", "sea_mask.npy"))
+    TOPOGRAPHY_CACHE_PATH: str = os.getenv("TOPOGRAPHY_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "topography", "topographic_grids.npy"))
+
+    # Storm cell segmentation (composite reflectivity thresholding)
+    STORM_REFLECTIVITY_THRESHOLD_DBZ: float = float(os.getenv("STORM_REFLECTIVITY_THRESHOLD_DBZ", "30.0"))
+    STORM_MIN_CELL_PIXELS: int = int(os.getenv("STORM_MIN_CELL_PIXELS", "4"))
+
+    # Radar composite geometry (rows, cols, levels)
+    RADAR_GRID_RESOLUTION_KM: float = float(os.getenv("RADAR_GRID_RESOLUTION_KM", "1.0"))
+    RADAR_LOWEST_LEVEL_KM: float = float(os.getenv("RADAR_LOWEST_LEVEL_KM", "0.5"))
+    RADAR_LEVEL_SPACING_KM: float = float(os.getenv("RADAR_LEVEL_SPACING_KM", "1.0"))
+
+    # Storm cell tracking between consecutive frames
+    TRACKING_MAX_SPEED_MS: float = float(os.getenv("TRACKING_MAX_SPEED_MS", "30.0"))
+    TRACKING_MAX_GAP_MINUTES: float = float(os.getenv("TRACKING_MAX_GAP_MINUTES", "30.0"))
+
     # Notification Settings
     ENABLE_EMAIL_NOTIFICATIONS: bool = os.getenv("ENABLE_EMAIL_NOTIFICATIONS", "False").lower() == "true"
     ENABLE_SMS_NOTIFICATIONS: bool = os.getenv("ENABLE_SMS_NOTIFICATIONS", "False").lower() == "true"
     # API keys for notification services would go here as well, e.g., TWILIO_ACCOUNT_SID
 
-    # Dummy path for initial radar data (will be replaced by live ingestion)
-    LATEST_RADAR_DATA_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "dummy_radar_composite.npy")
+    # Path of the latest radar composite (.npy, replaced atomically by live ingestion)
+    LATEST_RADAR_DATA_PATH: str = os.getenv("LATEST_RADAR_DATA_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "dummy_radar_composite.npy"))
+    # Number of recent composites kept memory-mapped for tracking (6 x 10 min = 1 hour)
+    RADAR_FRAME_BUFFER_SIZE: int = int(os.getenv("RADAR_FRAME_BUFFER_SIZE", "6"))
+
+    # Multi-radar mosaicking: per-radar tiles ({radar_id}.npy) are reprojected with precomputed
+    # index maps into one composite. Leave RADAR_MOSAIC_TILE_DIR empty to use LATEST_RADAR_DATA_PATH.
+    RADAR_MOSAIC_TILE_DIR: str = os.getenv("RADAR_MOSAIC_TILE_DIR", "")
+    RADAR_MOSAIC_INDEX_MAP_DIR: str = os.getenv("RADAR_MOSAIC_INDEX_MAP_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "mosaic_index_maps"))
+    RADAR_MOSAIC_MAX_WORKERS: int = int(os.getenv("RADAR_MOSAIC_MAX_WORKERS", "0")) # 0 = one per CPU
+    RADAR_NO_ECHO_DBZ: float = float(os.getenv("RADAR_NO_ECHO_DBZ", "-32.0"))
+
+    # Archive of every ingested composite (compressed spatial chunks + time index). Off by default:
+    # each frame adds tens of MB. Day partitions beyond the retention period / size cap (0 = no limit) are pruned.
+    RADAR_ARCHIVE_ENABLED: bool = os.getenv("RADAR_ARCHIVE_ENABLED", "False").lower() == "true"
+    RADAR_ARCHIVE_DIR: str = os.getenv("RADAR_ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "radar_archive"))
+    RADAR_ARCHIVE_CHUNK_SIZE: int = int(os.getenv("RADAR_ARCHIVE_CHUNK_SIZE", "256"))
+    RADAR_ARCHIVE_COMPRESSION_LEVEL: int = int(os.getenv("RADAR_ARCHIVE_COMPRESSION_LEVEL", "1"))
+    RADAR_ARCHIVE_RETENTION_DAYS: int = int(os.getenv("RADAR_ARCHIVE_RETENTION_DAYS", "7"))
+    RADAR_ARCHIVE_MAX_GB: float = float(os.getenv("RADAR_ARCHIVE_MAX_GB", "50"))
+    # Also archive the 81x81 echo-mask patch of every storm cell (uint8, keyed by cell id) as retraining samples
+    RADAR_ARCHIVE_PATCHES: bool = os.getenv("RADAR_ARCHIVE_PATCHES", "False").lower() == "true"
 
     # [cite_start]Variable Transformations as per paper Table I [cite: 108]
     VARIABLE_TRANSFORMATIONS = {
@@ -27,6 +27,7 @@ storm_cells_collection = database.storm_cells
 models_collection = database.models
 variable_importance_collection = database.variable_importance
 crowdsource_reports_collection = database.crowdsource_reports
+radar_cycles_collection = database.radar_cycles
 
 # Sync collections
 sync_users_collection = sync_database.users
@@ -37,4 +38,4 @@ sync_datasets_collection = sync_database.datasets
 sync_training_status_collection = sync_database.training_status
 sync_storm_cells_collection = sync_database.storm_cells
 sync_models_collection = sync_database.models
-sync_variable_importance_collection = sync_database.variable_importance
\ No newline at end of file
+sync_variable_importance_collection = sync_database.variable_importance
@@ -11,6 +11,11 @@ from app.services.ml_service import MLModelService
 from app.services.notification_service import NotificationService
 from app.services.data_ingestion_service import DataIngestionService
 from app.tasks.scheduler import start_scheduler, stop_scheduler # For background task scheduling
+from app.services.radar_mosaic import shutdown_mosaic_pool
+from app.services.radar_frame_store import radar_frame_store
+from app.services.inference_executor import inference_executor, event_loop_monitor
+from app.services.micro_batcher import NowcastMicroBatcher
+from app.services.training_worker import training_manager
 
 from app.email_conf import conf # Import from dedicated config file
 
@@ -26,17 +31,27 @@ data_ingestion_service_instance = DataIngestionService(
 async def lifespan(app: FastAPI):
     # Startup: Load models, start background scheduler
     print("Application startup initiated...")
+    event_loop_monitor.start()
     
-    ml_service_instance.load_models() # Load all ML models into memory
+    if settings.API_ONLY_MODE:
+        # This worker only serves stored results; the ML stack is never imported
+        print("API-only mode: skipping model loading and the nowcasting scheduler.")
+    else:
+        ml_service_instance.load_models() # Index the ML models (loaded on first use); warm-up runs in the background
 
-    # Start background data ingestion/nowcasting scheduler
-    start_scheduler(data_ingestion_service_instance, ml_service_instance)
+        # Start background data ingestion/nowcasting scheduler
+        start_scheduler(data_ingestion_service_instance, ml_service_instance)
 
-    print("Application startup complete. Scheduler running.")
+    print("Application startup complete." + ("" if settings.API_ONLY_MODE else " Scheduler running."))
     yield # Application runs
 
     # Shutdown: Clean up resources
     stop_scheduler() # Stop background scheduler
+    shutdown_mosaic_pool()
+    radar_frame_store.clear() # Frees the shared-memory mosaics still buffered
+    inference_executor.shutdown()
+    training_manager.shutdown()
+    event_loop_monitor.stop()
     print("Application shutdown complete.")
 
 app = FastAPI(
@@ -46,6 +61,10 @@ app = FastAPI(
     lifespan=lifespan # Use lifespan to manage startup/shutdown tasks
 )
 
+# Services reachable from request handlers
+app.state.ml_service = ml_service_instance
+app.state.nowcast_batcher = NowcastMicroBatcher(ml_service_instance)
+
 # Configure CORS middleware
 origins = [
     "http://localhost:3000",  # Your React frontend's local development address
@@ -70,4 +89,20 @@ app.include_router(crowdsource.router, prefix="/crowdsource", tags=["Crowdsourci
 
 @app.get("/")
 async def read_root():
-    return {"message": "Welcome to the Heavy Rainfall Nowcasting API! Access /docs for API documentation."}
\ No newline at end of file
+    return {"message": "Welcome to the Heavy Rainfall Nowcasting API! Access /docs for API documentation."}
+
+@app.get("/metrics")
+async def read_metrics():
+    """Event-loop blocking time, inference queue, resident models and nowcasting cycle counters."""
+    return {
+        "event_loop": event_loop_monitor.metrics(),
+        "inference": inference_executor.metrics(),
+        "on_demand_batching": app.state.nowcast_batcher.metrics(),
+        "model_warmup": ml_service_instance.warmup_metrics,
+        "model_registry": {
+            "classification": ml_service_instance.classification_models.metrics(),
+            "regression": ml_service_instance.regression_models.metrics(),
+        },
+        "prediction_cache": ml_service_instance.prediction_cache.metrics(),
+        "cycles": data_ingestion_service_instance.cycle_metrics,
+    }
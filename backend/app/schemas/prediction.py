@@ -63,4 +63,25 @@ class Warning(WarningBase):
 class NowcastResponse(BaseModel):
     timestamp: datetime
     selected_forecast_time: str
-    predicted_storm_cells: List[StormCellLocation]
\ No newline at end of file
+    predicted_storm_cells: List[StormCellLocation]
+
+# On-demand nowcasting of user-submitted cell features
+class OnDemandCell(BaseModel):
+    cell_id: Optional[str] = None
+    mcs_type: Optional[str] = None  # Derived from the features when omitted
+    features: Dict[str, float]      # One value per radar variable (settings.RADAR_VARIABLES)
+
+class OnDemandNowcastRequest(BaseModel):
+    forecast_time: str = "30min"
+    cells: List[OnDemandCell]
+
+class OnDemandCellPrediction(BaseModel):
+    cell_id: Optional[str] = None
+    mcs_type: str
+    storm_cell_predicted: bool
+    predicted_mean_rain_rate: Optional[float] = None
+    predicted_top_10_rain_rate: Optional[float] = None
+
+class OnDemandNowcastResponse(BaseModel):
+    forecast_time: str
+    predictions: List[OnDemandCellPrediction]
@@ -1,4 +1,5 @@
 # backend/app/services/data_ingestion_service.py
+import asyncio
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -6,14 +7,19 @@ from app.config import settings
 from app.services.ml_service import MLModelService
 from app.services.notification_service import NotificationService
 from app.services.data_preprocessing import (
-    get_radar_data, identify_storm_cells, derive_all_variables,
-    categorize_storm_cell, generate_image_patch
+    get_radar_data, get_radar_mosaic, identify_storm_cells, derive_all_variables, compute_rain_rates,
+    classify_mcs_types, generate_image_patches
 )
+from app.services.storm_tracker import StormCellTracker
+from app.services.radar_frame_store import compute_frame_fingerprint, RadarFrameNotFoundError
+from app.services.radar_archive import radar_archive
+from app.services.radar_mosaic import compute_tiles_fingerprint, find_radar_tiles
 # --- MODIFIED IMPORTS ---
 # Remove SQLAlchemy components and import MongoDB collections
 from app.database import (
     warnings_collection, 
     predictions_collection,
+    radar_cycles_collection,
     # NOTE: You may need to create this collection in your database.py file
     # For now, we'll assume it exists and is named 'storm_cell_locations'
     database 
@@ -28,6 +34,93 @@ class DataIngestionService:
     def __init__(self, ml_service: MLModelService, notification_service: NotificationService):
         self.ml_service = ml_service
         self.notification_service = notification_service
+        self.storm_tracker = StormCellTracker()
+        # Fingerprint of the last processed composite and cycle counters
+        self.last_frame_fingerprint = None
+        self._last_cycle_id = None
+        self._last_cycle_loaded = False
+        self.cycle_metrics = {"processed": 0, "skipped": 0}
+
+    async def _load_last_cycle(self):
+        """Restores the fingerprint of the last processed frame so restarts do not reprocess it."""
+        self._last_cycle_loaded = True
+        try:
+            last_cycle = await radar_cycles_collection.find_one({}, sort=[("processed_at", -1)])
+        except Exception as e:
+            print(f"Could not load the last radar cycle: {e}")
+            return
+        if last_cycle:
+            self._last_cycle_id = last_cycle["_id"]
+            self.last_frame_fingerprint = last_cycle.get("fingerprint")
+
+    @staticmethod
+    def _frame_timestamp(fingerprint: dict) -> datetime:
+        """
+        Observation time of a composite: the mtime of its file, or of the newest
+        tile for a mosaic; the current time if the fingerprint has none.
+        """
+        tiles = fingerprint.get("tiles")
+        mtime_ns = max((t.get("mtime_ns", 0) for t in tiles.values()), default=0) if tiles else fingerprint.get("mtime_ns", 0)
+        if not mtime_ns:
+            return datetime.utcnow()
+        return datetime.utcfromtimestamp(mtime_ns / 1e9)
+
+    def _is_unchanged_frame(self, fingerprint: dict) -> bool:
+        previous = self.last_frame_fingerprint
+        return previous is not None and previous.get("content_hash") == fingerprint["content_hash"]
+
+    async def _record_processed_cycle(self, fingerprint: dict, cell_count: int):
+        self.last_frame_fingerprint = fingerprint
+        self.cycle_metrics["processed"] += 1
+        try:
+            result = await radar_cycles_collection.insert_one({
+                "fingerprint": fingerprint,
+                "processed_at": datetime.utcnow(),
+                "cell_count": cell_count,
+                "skipped_cycles": 0,
+            })
+            self._last_cycle_id = result.inserted_id
+        except Exception as e:
+            print(f"Could not record radar cycle: {e}")
+
+    async def _record_skipped_cycle(self):
+        self.cycle_metrics["skipped"] += 1
+        if self._last_cycle_id is None:
+            return
+        try:
+            await radar_cycles_collection.update_one(
+                {"_id": self._last_cycle_id},
+                {"$inc": {"skipped_cycles": 1}, "$set": {"last_skipped_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            print(f"Could not record skipped radar cycle: {e}")
+
+    def _extract_storm_cells(self, radar_composite, timestamp: datetime):
+        """Segments the composite, tracks its cells and derives their input variables."""
+        storm_cells = identify_storm_cells(radar_composite)
+
+        # Link cells to the previous frame for persistent ids, motion and lagged rain rates
+        # (also on empty frames, so stale tracks are not continued later)
+        tracking = self.storm_tracker.update(
+            storm_cells,
+            compute_rain_rates(radar_composite, storm_cells),
+            timestamp
+        )
+        if len(storm_cells) == 0:
+            return storm_cells, tracking, None
+
+        # One batch pass computes the 22 input variables of every cell
+        all_input_features_df = derive_all_variables(
+            storm_cells, radar_composite,
+            motion=tracking.motion, prev_rain_rates=tracking.prev_rain_rates
+        )
+        all_input_features_df.index = tracking.cell_ids
+        return storm_cells, tracking, all_input_features_df
+
+    def _archive_cell_patches(self, radar_composite, storm_cells, cell_ids, timestamp: datetime):
+        """Archives the image patch of every cell, keyed by its tracked id, for retraining."""
+        patches = generate_image_patches(radar_composite, storm_cells.center_pixel_coords)
+        radar_archive.append_patches(timestamp, cell_ids, patches)
 
     async def process_new_radar_data(self):
         """
@@ -42,85 +135,122 @@ class DataIngestionService:
             print("Models not trained yet. Skipping prediction cycle.")
             return
 
-        # --- 1. Ingest Latest Radar Data ---
-        latest_radar_composite = get_radar_data(settings.LATEST_RADAR_DATA_PATH)
+        # --- 1. Ingest Latest Radar Data (skipping frames that were already processed) ---
+        if not self._last_cycle_loaded:
+            await self._load_last_cycle()
+        try:
+            # Hashing a changed composite reads the whole file, so it runs in a thread
+            if settings.RADAR_MOSAIC_TILE_DIR:
+                frame_fingerprint = await asyncio.to_thread(
+                    compute_tiles_fingerprint, find_radar_tiles(), previous=self.last_frame_fingerprint
+                )
+            else:
+                frame_fingerprint = await asyncio.to_thread(
+                    compute_frame_fingerprint, settings.LATEST_RADAR_DATA_PATH, previous=self.last_frame_fingerprint
+                )
+        except RadarFrameNotFoundError as e:
+            print(f"Radar frame missing: {e}. Skipping cycle.")
+            return
+        if self._is_unchanged_frame(frame_fingerprint):
+            await self._record_skipped_cycle()
+            print(f"Radar composite unchanged since the last processed cycle. Skipping "
+                  f"({self.cycle_metrics['skipped']} skipped, {self.cycle_metrics['processed']} processed).")
+            return
+
+        if settings.RADAR_MOSAIC_TILE_DIR:
+            latest_radar_composite = await asyncio.to_thread(get_radar_mosaic)
+        else:
+            latest_radar_composite = get_radar_data(settings.LATEST_RADAR_DATA_PATH)
         if latest_radar_composite is None:
             print("No new radar data loaded for processing. Skipping cycle.")
             return
 
-        current_now_timestamp = datetime.utcnow()
+        # Tracking, archiving and forecast lead times follow the composite's own time, not the cycle's
+        current_now_timestamp = self._frame_timestamp(frame_fingerprint)
 
-        # --- 2. Identify & Process Storm Cells ---
-        identified_storm_cells_raw = identify_storm_cells(latest_radar_composite)
+        # Keep every new composite for replay and retraining (compression runs off the event loop)
+        if settings.RADAR_ARCHIVE_ENABLED:
+            try:
+                await asyncio.to_thread(radar_archive.append, latest_radar_composite, current_now_timestamp)
+            except Exception as e:
+                print(f"Error archiving radar frame: {e}")
 
-        if not identified_storm_cells_raw:
+        # --- 2. Identify & Process Storm Cells (CPU-bound, so off the event loop) ---
+        storm_cells, tracking, all_input_features_df = await asyncio.to_thread(
+            self._extract_storm_cells, latest_radar_composite, current_now_timestamp
+        )
+
+        if len(storm_cells) == 0:
             print("No storm cells identified in the latest radar data. Skipping prediction.")
+            await self._record_processed_cycle(frame_fingerprint, cell_count=0)
             return
 
-        for cell_raw_data in identified_storm_cells_raw:
-            cell_id = cell_raw_data["id"]
-            print(f"Processing storm cell: {cell_id}")
+        if settings.RADAR_ARCHIVE_ENABLED and settings.RADAR_ARCHIVE_PATCHES:
+            try:
+                await asyncio.to_thread(
+                    self._archive_cell_patches, latest_radar_composite, storm_cells, tracking.cell_ids, current_now_timestamp
+                )
+            except Exception as e:
+                print(f"Error archiving cell patches: {e}")
 
-            all_input_features_dict = derive_all_variables(
-                storm_cell_data=cell_raw_data,
-                radar_composite=latest_radar_composite,
-                current_topographic_features=cell_raw_data["current_topographic_features_raw"]
-            )
-            input_features_df = pd.DataFrame([all_input_features_dict])
-            mcs_type = categorize_storm_cell(all_input_features_dict)
-            image_patch = generate_image_patch(
-                latest_radar_composite,
-                cell_raw_data["center_pixel_coords"]
-            )
+        mcs_types = classify_mcs_types(all_input_features_df[settings.RADAR_VARIABLES].to_numpy())
+        radar_features_df = all_input_features_df[settings.RADAR_VARIABLES]
+        cell_ids = tracking.cell_ids
+        print(f"Processing {len(cell_ids)} storm cells: " + ", ".join(
+            f"{n} {t}" for t, n in zip(*np.unique(mcs_types, return_counts=True))
+        ))
 
-            # --- 3. Loop for 30-min and 60-min forecasts ---
-            for forecast_offset_minutes in [30, 60]:
-                forecast_time_str = f"{forecast_offset_minutes}min"
-                predicted_future_timestamp = current_now_timestamp + timedelta(minutes=forecast_offset_minutes)
+        # --- 3. Loop for 30-min and 60-min forecasts (one batched call per model) ---
+        for forecast_offset_minutes in [30, 60]:
+            forecast_time_str = f"{forecast_offset_minutes}min"
+            predicted_future_timestamp = current_now_timestamp + timedelta(minutes=forecast_offset_minutes)
 
-                print(f"  -> Forecasting for {cell_id} at {forecast_time_str}")
+            print(f"  -> Forecasting {len(cell_ids)} cells at {forecast_time_str}")
 
-                # --- 3a. Predict Storm Cell Location ---
-                try:
-                    is_storm_cell_predicted = self.ml_service.predict_storm_location(
-                        image_patch=image_patch,
-                        additional_features=input_features_df[settings.RADAR_VARIABLES + settings.TOPOGRAPHIC_VARIABLES],
-                        mcs_type=mcs_type,
-                        forecast_time=forecast_time_str
-                    )
-                    print(f"    Storm cell location predicted: {'YES' if is_storm_cell_predicted else 'NO'}")
-                except Exception as e:
-                    print(f"    Error in storm cell location prediction: {e}. Assuming NO storm cell.")
-                    is_storm_cell_predicted = 0
+            # --- 3a. Predict Storm Cell Location ---
+            try:
+                is_storm_cell_predicted = await self.ml_service.predict_storm_location_batch_async(
+                    features=radar_features_df,
+                    mcs_types=mcs_types,
+                    forecast_time=forecast_time_str
+                )
+            except Exception as e:
+                print(f"    Error in storm cell location prediction: {e}. Assuming NO storm cells.")
+                continue
 
-                if not is_storm_cell_predicted:
-                    print(f"    No storm cell predicted for {cell_id} in {forecast_time_str}. Skipping rain rate prediction.")
-                    continue
+            predicted_rows = np.flatnonzero(is_storm_cell_predicted)
+            print(f"    Storm cell location predicted for {len(predicted_rows)} of {len(cell_ids)} cells.")
+            if len(predicted_rows) == 0:
+                continue
 
-                # --- 3b. Predict Rain Rates ---
-                predicted_mean_rr, predicted_top10_rr = 0.0, 0.0
-                best_regression_model_name = 'ann'
-                try:
-                    radar_only_features_df = input_features_df[settings.RADAR_VARIABLES]
-                    predicted_mean_rr = self.ml_service.predict_rain_rate(
-                        input_features=radar_only_features_df, mcs_type=mcs_type, forecast_time=forecast_time_str,
-                        rain_rate_type='MeanRR', model_name=best_regression_model_name
-                    )
-                    predicted_top10_rr = self.ml_service.predict_rain_rate(
-                        input_features=radar_only_features_df, mcs_type=mcs_type, forecast_time=forecast_time_str,
-                        rain_rate_type='Top10%', model_name=best_regression_model_name
-                    )
-                    print(f"    Predicted MeanRR: {predicted_mean_rr:.2f} mm/h, Top10%RR: {predicted_top10_rr:.2f} mm/h")
-                except Exception as e:
-                    print(f"    Error during rain rate prediction: {e}. Skipping warning for this cell/time.")
+            # --- 3b. Predict Rain Rates ---
+            best_regression_model_name = 'ann'
+            try:
+                predicted_mean_rr, predicted_top10_rr = (await self.ml_service.predict_rain_rates_batch_async(
+                    features=radar_features_df.iloc[predicted_rows], mcs_types=mcs_types[predicted_rows],
+                    forecast_time=forecast_time_str, model_name=best_regression_model_name,
+                    rain_rate_types=('MeanRR', 'Top10%'),
+                )).T
+            except Exception as e:
+                print(f"    Error during rain rate prediction: {e}. Skipping warnings for {forecast_time_str}.")
+                continue
+
+            storm_locations, rainfall_predictions = [], []
+            for row, cell_mean_rr, cell_top10_rr in zip(predicted_rows, predicted_mean_rr, predicted_top10_rr):
+                cell_id = cell_ids[row]
+                mcs_type = str(mcs_types[row])
+                if np.isnan(cell_mean_rr) or np.isnan(cell_top10_rr):
+                    print(f"    No rain rate model for {cell_id} ({mcs_type}). Skipping warning for this cell/time.")
                     continue
+                cell_mean_rr, cell_top10_rr = float(cell_mean_rr), float(cell_top10_rr)
+                print(f"    {cell_id}: Predicted MeanRR: {cell_mean_rr:.2f} mm/h, Top10%RR: {cell_top10_rr:.2f} mm/h")
 
                 # --- 4. Issue Early Warnings (MongoDB Logic) ---
-                if predicted_top10_rr >= settings.HEAVY_RAINFALL_THRESHOLD_MM_H:
+                if cell_top10_rr >= settings.HEAVY_RAINFALL_THRESHOLD_MM_H:
                     warning_message = (
                         f"Heavy rainfall predicted for storm cell '{cell_id}' ({mcs_type} type) "
                         f"in {forecast_offset_minutes} minutes! "
-                        f"Predicted Top 10% Mean Rain Rate: {predicted_top10_rr:.2f} mm/h. "
+                        f"Predicted Top 10% Mean Rain Rate: {cell_top10_rr:.2f} mm/h. "
                         f"Expected at: {predicted_future_timestamp.strftime('%Y-%m-%d %H:%M:%S')} UTC."
                     )
                     print(f"    *** WARNING ISSUED: {warning_message}")
@@ -141,7 +271,7 @@ class DataIngestionService:
                         new_warning_data = WarningCreate(
                             cell_id=cell_id, mcs_type=mcs_type, forecast_time=forecast_offset_minutes,
                             predicted_timestamp=predicted_future_timestamp,
-                            predicted_top10_mean_rr=predicted_top10_rr, message=warning_message,
+                            predicted_top10_mean_rr=cell_top10_rr, message=warning_message,
                             location_geojson={"type": "Polygon", "coordinates": [[[127.0, 36.0], [127.5, 36.0], [127.5, 36.5], [127.0, 36.5], [127.0, 36.0]]]}
                         )
                         # Insert new warning into MongoDB
@@ -153,25 +283,27 @@ class DataIngestionService:
                     else:
                         print(f"    Warning for {cell_id} ({forecast_time_str}) already active. Skipping duplicate notification.")
                 else:
-                    print(f"    Predicted Top10%RR ({predicted_top10_rr:.2f}) below threshold ({settings.HEAVY_RAINFALL_THRESHOLD_MM_H}). No warning.")
+                    print(f"    Predicted Top10%RR ({cell_top10_rr:.2f}) below threshold ({settings.HEAVY_RAINFALL_THRESHOLD_MM_H}). No warning.")
 
-                # --- 5. Store Predictions in Database (MongoDB Logic) ---
-                # Store StormCellLocation prediction
-                storm_loc_data = StormCellLocationCreate(
+                # --- 5. Collect Predictions for the Database ---
+                storm_locations.append(StormCellLocationCreate(
                     cell_id=cell_id, mcs_type=mcs_type, forecast_time=forecast_offset_minutes,
                     predicted_timestamp=predicted_future_timestamp,
-                    predicted_location_json={"type": "Polygon", "coordinates": [[[127.0, 36.0], [127.5, 36.0], [127.5, 36.5], [127.0, 36.5], [127.0, 36.0]]]}
-                )
-                await storm_cell_locations_collection.insert_one(storm_loc_data.model_dump())
-
-                # Store RainfallPrediction
-                rainfall_pred_data = RainfallPredictionCreate(
+                    predicted_location_geojson={"type": "Polygon", "coordinates": [[[127.0, 36.0], [127.5, 36.0], [127.5, 36.5], [127.0, 36.5], [127.0, 36.0]]]},
+                    predicted_mean_rr=cell_mean_rr, predicted_top10_mean_rr=cell_top10_rr
+                ).model_dump())
+                rainfall_predictions.append(RainfallPredictionCreate(
                     cell_id=cell_id, mcs_type=mcs_type, forecast_time=forecast_offset_minutes,
-                    predicted_timestamp=predicted_future_timestamp, predicted_mean_rr=predicted_mean_rr,
-                    predicted_top10_mean_rr=predicted_top10_rr
-                )
-                await predictions_collection.insert_one(rainfall_pred_data.model_dump())
-                print(f"    Predictions stored for {cell_id} ({forecast_time_str}).")
+                    predicted_timestamp=predicted_future_timestamp, predicted_mean_rr=cell_mean_rr,
+                    predicted_top10_mean_rr=cell_top10_rr
+                ).model_dump())
+
+            # Store StormCellLocation and RainfallPrediction documents in one write each (MongoDB Logic)
+            if storm_locations:
+                await storm_cell_locations_collection.insert_many(storm_locations)
+                await predictions_collection.insert_many(rainfall_predictions)
+                print(f"    Predictions stored for {len(rainfall_predictions)} cells ({forecast_time_str}).")
 
+        await self._record_processed_cycle(frame_fingerprint, cell_count=len(storm_cells))
         print(f"--- [{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] End of radar data processing cycle ---")
 
@@ -1,122 +1,445 @@
 # backend/app/services/data_preprocessing.py
 import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Dict, List
+from scipy import ndimage
 from app.config import settings
+from app.services.radar_frame_store import RadarFrame, RadarFrameStore, RadarFrameNotFoundError, radar_frame_store
+from app.services.radar_mosaic import build_mosaic
+from app.services.topography import topography_cache
 import os
 
-# --- PLACEHOLDER FUNCTIONS FOR COMPLEX RADAR PROCESSING ---
-# These functions represent significant work that needs to be implemented
-# based on the paper's specifics and your radar data source.
-
-def get_radar_data(data_path: str):
-    """
-    PLACEHOLDER: Fetches the latest 3D radar composite data.
-    In a real system, this would involve connecting to KMA's API,
-    sFTP, or reading from a data stream.
-    For now, simulates loading a dummy numpy array or file.
-    """
-    os.makedirs(os.path.dirname(data_path), exist_ok=True)
-    print(f"Simulating fetching radar data from: {data_path}")
-    if os.path.exists(data_path):
-        try:
-            # Load a dummy numpy array representing a radar composite
-            return np.load(data_path)
-        except Exception as e:
-            print(f"Error loading dummy radar data from {data_path}: {e}")
-            return None
+# --- Radar composite ingestion, storm cell segmentation, variable derivation and MCS typing ---
+
+def get_radar_data(data_path: str, frame_store: RadarFrameStore = None):
+    """
+    Fetches the latest 3D radar composite (rows, cols, levels) as a read-only
+    memory map held in the rolling frame buffer.
+    In a real system the composite is delivered by KMA's API, sFTP or a data
+    stream and written atomically to ``data_path``.
+    Returns None, with a clear message, when no composite is available.
+    """
+    if frame_store is None:
+        frame_store = radar_frame_store
+    try:
+        frame = frame_store.open(data_path)
+    except RadarFrameNotFoundError as e:
+        print(f"Radar frame missing: {e}. No composite is available for this cycle.")
+        return None
+    except Exception as e:
+        print(f"Error loading radar data from {data_path}: {e}")
+        return None
+    print(f"Loaded radar composite {frame.data.shape} from: {data_path}")
+    return frame.data
+
+
+def get_radar_mosaic(frame_store: RadarFrameStore = None):
+    """
+    Builds the latest composite from the per-radar tiles in RADAR_MOSAIC_TILE_DIR
+    (see radar_mosaic.build_mosaic) and pushes it into the rolling frame buffer.
+    The shared-memory block is freed once the frame is evicted from the buffer
+    and no view of it is still in use.
+    Returns None, with a clear message, when the mosaic cannot be built.
+    """
+    if frame_store is None:
+        frame_store = radar_frame_store
+    try:
+        mosaic = build_mosaic()
+    except RadarFrameNotFoundError as e:
+        print(f"Radar frame missing: {e}. No composite is available for this cycle.")
+        return None
+    except Exception as e:
+        print(f"Error building radar mosaic: {e}")
+        return None
+    frame_store.push(RadarFrame(
+        path="mosaic", data=mosaic.data, size=mosaic.data.nbytes, mtime_ns=0,
+        opened_at=datetime.utcnow(), release=mosaic.release,
+    ))
+    return mosaic.data
+
+
+@dataclass
+class StormCellTable:
+    """
+    Array-backed table of storm cells segmented from one radar composite.
+    Row i describes the cell with label ``labels[i]`` in ``label_image``.
+    Pixels of each cell are stored CSR-style: the flat (row-major) indices of
+    cell i are ``pixel_index[pixel_offsets[i]:pixel_offsets[i + 1]]``.
+    """
+    label_image: np.ndarray          # (rows, cols) int32, 0 = no echo
+    composite_reflectivity: np.ndarray  # (rows, cols) column-maximum reflectivity (dBZ)
+    labels: np.ndarray               # (N,) int32
+    centroids: np.ndarray            # (N, 2) float32, (row, col)
+    pixel_counts: np.ndarray         # (N,) int64
+    bboxes: np.ndarray               # (N, 4) int32, (row_min, col_min, row_max, col_max), inclusive
+    pixel_index: np.ndarray          # (sum(pixel_counts),) int64, grouped by cell
+    pixel_offsets: np.ndarray        # (N + 1,) int64
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def cell_ids(self) -> List[str]:
+        return [f"cell_{label}" for label in self.labels]
+
+    @property
+    def center_pixel_coords(self) -> np.ndarray:
+        """Centroids rounded to the nearest (row, col) pixel."""
+        return np.rint(self.centroids).astype(np.int64)
+
+    @property
+    def pixel_labels(self) -> np.ndarray:
+        """Row index into this table for every entry of ``pixel_index``."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.pixel_counts)
+
+
+# 8-connectivity: diagonal neighbours belong to the same echo
+_CELL_CONNECTIVITY = np.ones((3, 3), dtype=bool)
+
+
+def column_maximum(radar_composite: np.ndarray) -> np.ndarray:
+    """
+    Collapses a (rows, cols, levels) composite to its column-maximum reflectivity.
+    Accumulating level by level is several times faster than ``max(axis=2)``,
+    whose inner loop runs over only a handful of levels.
+    """
+    if radar_composite.ndim == 2:
+        return np.asarray(radar_composite)
+    composite = np.array(radar_composite[:, :, 0])
+    for level in range(1, radar_composite.shape[2]):
+        np.maximum(composite, radar_composite[:, :, level], out=composite)
+    return composite
+
+
+def identify_storm_cells(radar_composite: np.ndarray, threshold_dbz: float = None, min_pixels: int = None) -> StormCellTable:
+    """
+    [cite_start]Identifies discrete storm cells in the radar composite (FAST segmentation step)[cite: 79].
+    The 3D composite (rows, cols, levels) is collapsed to its column maximum,
+    thresholded at STORM_REFLECTIVITY_THRESHOLD_DBZ and labeled into
+    8-connected echoes in a single pass. Echoes smaller than
+    STORM_MIN_CELL_PIXELS are discarded. All per-cell statistics are computed
+    with grouped reductions, so cost scales with the number of echo pixels
+    rather than the number of cells.
+    """
+    if threshold_dbz is None:
+        threshold_dbz = settings.STORM_REFLECTIVITY_THRESHOLD_DBZ
+    if min_pixels is None:
+        min_pixels = settings.STORM_MIN_CELL_PIXELS
+
+    composite = column_maximum(radar_composite)
+    label_image, n_labels = ndimage.label(composite >= threshold_dbz, structure=_CELL_CONNECTIVITY)
+
+    # Drop small echoes and renumber the survivors 1..N
+    label_sizes = np.bincount(label_image.ravel(), minlength=n_labels + 1)
+    keep = label_sizes >= max(min_pixels, 1)
+    keep[0] = False
+    n_cells = int(keep.sum())
+    if n_cells < n_labels:
+        remap = np.zeros(n_labels + 1, dtype=np.int32)
+        remap[keep] = np.arange(1, n_cells + 1, dtype=np.int32)
+        label_image = remap[label_image]
+    label_image = label_image.astype(np.int32, copy=False)
+    pixel_counts = label_sizes[keep].astype(np.int64)
+
+    # Group echo pixels by label; a stable sort keeps raster order within each cell
+    flat_labels = label_image.ravel()
+    pixel_index = np.flatnonzero(flat_labels)
+    pixel_index = pixel_index[np.argsort(flat_labels[pixel_index], kind="stable")]
+    pixel_offsets = np.zeros(n_cells + 1, dtype=np.int64)
+    np.cumsum(pixel_counts, out=pixel_offsets[1:])
+
+    if n_cells == 0:
+        return StormCellTable(
+            label_image=label_image,
+            composite_reflectivity=composite,
+            labels=np.zeros(0, dtype=np.int32),
+            centroids=np.zeros((0, 2), dtype=np.float32),
+            pixel_counts=pixel_counts,
+            bboxes=np.zeros((0, 4), dtype=np.int32),
+            pixel_index=pixel_index,
+            pixel_offsets=pixel_offsets,
+        )
+
+    rows, cols = np.divmod(pixel_index, composite.shape[1])
+    starts = pixel_offsets[:-1]
+    # Raster order within a cell means its first/last pixels carry the row extremes
+    row_min = rows[starts]
+    row_max = rows[pixel_offsets[1:] - 1]
+    col_min = np.minimum.reduceat(cols, starts)
+    col_max = np.maximum.reduceat(cols, starts)
+    centroids = np.column_stack((
+        np.add.reduceat(rows, starts) / pixel_counts,
+        np.add.reduceat(cols, starts) / pixel_counts,
+    )).astype(np.float32)
+
+    print(f"Identified {n_cells} storm cells above {threshold_dbz} dBZ.")
+    return StormCellTable(
+        label_image=label_image,
+        composite_reflectivity=composite,
+        labels=np.arange(1, n_cells + 1, dtype=np.int32),
+        centroids=centroids,
+        pixel_counts=pixel_counts,
+        bboxes=np.column_stack((row_min, col_min, row_max, col_max)).astype(np.int32),
+        pixel_index=pixel_index,
+        pixel_offsets=pixel_offsets,
+    )
+
+# Marshall-Palmer Z-R relationship (Z = 200 R^1.6) and VIL hail cap
+_ZR_A, _ZR_B = 200.0, 1.6
+_VIL_MAX_DBZ = 56.0
+
+
+def radar_level_heights_km(n_levels: int) -> np.ndarray:
+    """Height (km) of each vertical level of the composite."""
+    return settings.RADAR_LOWEST_LEVEL_KM + settings.RADAR_LEVEL_SPACING_KM * np.arange(n_levels)
+
+
+def _gather_cell_columns(radar_composite: np.ndarray, storm_cells: StormCellTable) -> np.ndarray:
+    """Gathers the vertical profiles of all cell pixels as a (pixels, levels) array."""
+    if radar_composite.ndim == 2:
+        return np.asarray(radar_composite).ravel()[storm_cells.pixel_index, None]
+    n_levels = radar_composite.shape[2]
+    return np.asarray(radar_composite).reshape(-1, n_levels)[storm_cells.pixel_index]
+
+
+def _rain_rates_from_profiles(profiles: np.ndarray, storm_cells: StormCellTable) -> np.ndarray:
+    """Mean and top-10% mean rain rate (mm/h) of each cell from its lowest-level reflectivity."""
+    n_cells = len(storm_cells)
+    # R = (Z / a)^(1/b) with Z = 10^(dBZ/10), folded into a single power
+    rain_rate = 10.0 ** (profiles[:, 0].astype(np.float64) / (10.0 * _ZR_B)) / _ZR_A ** (1.0 / _ZR_B)
+    pixel_labels = storm_cells.pixel_labels
+    mean_rr = np.bincount(pixel_labels, weights=rain_rate, minlength=n_cells) / storm_cells.pixel_counts
+
+    # Sort rain rates ascending within each cell (one argsort on label + normalized rate)
+    # and keep the last ceil(10%) of every group
+    order = np.argsort(pixel_labels + rain_rate / (rain_rate.max() * 2.0 + 1.0))
+    rank_in_cell = np.arange(len(order)) - storm_cells.pixel_offsets[pixel_labels]
+    top_count = np.ceil(0.1 * storm_cells.pixel_counts).astype(np.int64)
+    in_top = rank_in_cell >= (storm_cells.pixel_counts - top_count)[pixel_labels]
+    top10_rr = np.bincount(pixel_labels[in_top], weights=rain_rate[order][in_top], minlength=n_cells) / top_count
+    return np.column_stack((mean_rr, top10_rr)).astype(np.float32)
+
+
+def compute_rain_rates(radar_composite: np.ndarray, storm_cells: StormCellTable) -> np.ndarray:
+    """
+    Observed rain rates of all cells as an (N, 2) float32 array of
+    (MeanRR, Top10%) in mm/h, using the Marshall-Palmer Z-R relationship on
+    the lowest level of the composite.
+    """
+    if len(storm_cells) == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+    return _rain_rates_from_profiles(_gather_cell_columns(radar_composite, storm_cells), storm_cells)
+
+
+def extract_radar_features(
+    radar_composite: np.ndarray,
+    storm_cells: StormCellTable,
+    motion: np.ndarray = None,
+    prev_rain_rates: np.ndarray = None,
+) -> np.ndarray:
+    """
+    [cite_start]Computes the 17 Table I radar variables [cite: 108] for every storm cell at once.
+    Returns an (N, 17) float32 matrix whose columns follow settings.RADAR_VARIABLES.
+
+    Per-pixel quantities (echo top/base, VIL, height of maximum reflectivity)
+    are computed on the gathered cell columns and reduced per cell with
+    ``reduceat`` over the CSR pixel groups of ``storm_cells``.
+    ``motion`` is an optional (N, 2) array of (U, V) in m/s and
+    ``prev_rain_rates`` an optional (N, 2) array of (MeanRR, Top10%) from the
+    previous frame; without them motion is zero and the current rain rates
+    are used (persistence).
+    """
+    n_cells = len(storm_cells)
+    features = np.zeros((n_cells, len(settings.RADAR_VARIABLES)), dtype=np.float32)
+    if n_cells == 0:
+        return features
+
+    threshold_dbz = settings.STORM_REFLECTIVITY_THRESHOLD_DBZ
+    pixel_km = settings.RADAR_GRID_RESOLUTION_KM
+    level_km = settings.RADAR_LEVEL_SPACING_KM
+    counts = storm_cells.pixel_counts
+    starts = storm_cells.pixel_offsets[:-1]
+    pixel_labels = storm_cells.pixel_labels
+
+    profiles = _gather_cell_columns(radar_composite, storm_cells).astype(np.float32, copy=False)
+    heights = radar_level_heights_km(profiles.shape[1])
+    column_max = storm_cells.composite_reflectivity.ravel()[storm_cells.pixel_index]
+
+    # --- Shape: ellipse fitted to the second moments of the cell footprint ---
+    rows, cols = np.divmod(storm_cells.pixel_index, storm_cells.label_image.shape[1])
+    x = cols.astype(np.float64)
+    y = -rows.astype(np.float64)  # row 0 is the northern edge
+    mean_x = np.add.reduceat(x, starts) / counts
+    mean_y = np.add.reduceat(y, starts) / counts
+    dx = x - mean_x[pixel_labels]
+    dy = y - mean_y[pixel_labels]
+    # + 1/12 accounts for the extent of each square pixel
+    var_x = np.add.reduceat(dx * dx, starts) / counts + 1.0 / 12.0
+    var_y = np.add.reduceat(dy * dy, starts) / counts + 1.0 / 12.0
+    cov_xy = np.add.reduceat(dx * dy, starts) / counts
+    spread = np.sqrt(((var_x - var_y) / 2.0) ** 2 + cov_xy ** 2)
+    major_var = (var_x + var_y) / 2.0 + spread
+    minor_var = np.maximum((var_x + var_y) / 2.0 - spread, 0.0)
+    # A uniform ellipse with semi-axis a has variance a^2 / 4 along that axis
+    rmj = 2.0 * np.sqrt(major_var) * pixel_km
+    rmn = 2.0 * np.sqrt(minor_var) * pixel_km
+    theta = np.degrees(0.5 * np.arctan2(2.0 * cov_xy, var_x - var_y)) % 180.0
+
+    # --- Vertical structure ---
+    echo = profiles >= threshold_dbz
+    has_echo = echo.any(axis=1)
+    n_levels = profiles.shape[1]
+    top_level = np.where(has_echo, n_levels - 1 - np.argmax(echo[:, ::-1], axis=1), -1)
+    base_level = np.where(has_echo, np.argmax(echo, axis=1), n_levels)
+    cell_top = np.maximum.reduceat(top_level, starts)
+    cell_base = np.minimum.reduceat(base_level, starts)
+    volume = np.add.reduceat(echo.sum(axis=1), starts) * pixel_km * pixel_km * level_km
+
+    mean_z = np.add.reduceat(column_max.astype(np.float64), starts) / counts
+    max_z = np.maximum.reduceat(column_max, starts)
+    max_z_height = heights[np.argmax(profiles, axis=1)]
+    is_peak = column_max == max_z[pixel_labels]
+    max_z_hg = np.maximum.reduceat(np.where(is_peak, max_z_height, -np.inf), starts)
+
+    # --- Vertically integrated liquid (kg/m^2), Greene & Clark (1972) ---
+    dbz = np.minimum(profiles, np.float32(_VIL_MAX_DBZ))
+    z_linear = np.where(dbz > 0.0, np.power(np.float32(10.0), dbz / np.float32(10.0)), np.float32(0.0))
+    if n_levels > 1:
+        layer_z = 0.5 * (z_linear[:, 1:] + z_linear[:, :-1])
+        vil = np.power(layer_z, np.float32(4.0 / 7.0)).sum(axis=1, dtype=np.float64) * 3.44e-6 * level_km * 1000.0
     else:
-        print(f"Dummy radar data file not found at {data_path}. Creating a dummy one.")
-        dummy_data = np.random.rand(100, 100, 10) # Example: 100x100 grid, 10 vertical levels
-        np.save(data_path, dummy_data)
-        return dummy_data
-
-
-def identify_storm_cells(radar_composite: np.ndarray):
-    """
-    [cite_start]PLACEHOLDER: Implements the Fuzzy Logic Algorithm for Storm Tracking (FAST)[cite: 79].
-    This is a complex algorithm to identify discrete storm cells from radar data.
-    Returns a list of identified storm cell objects/dictionaries.
-    """
-    print("Simulating storm cell identification (FAST algorithm)...")
-    # In reality, this involves image processing, thresholding, object segmentation.
-
-    # Return dummy identified cells for now
-    dummy_cells = [
-        {
-            "id": "cell_A",
-            "center_pixel_coords": (50, 50), # (row, col) on the radar composite
-            "prev_radar_features_raw": {
-                "Rmj": 18.0, "Rmn": 6.0, "Theta": 30.0, "MeanZ": 38.0, "Area": 90.0,
-                "Volume": 250.0, "Top": 12.0, "Base": 0.8, "MaxZ": 55.0, "MaxZhg": 6.0,
-                "AvgVIL": 2.5, "MaxVIL": 6.0, "U": 8.0, "V": 4.0, "Direction": 27.0,
-                "MeanRR_prev": 12.0, "Top10%_prev": 28.0 # Previous values of rain rate
-            },
-            "current_topographic_features_raw": {
-                "dist_to_sea": 50.0, "elevation": 200.0, "aspect": 180.0, "roughness": 0.3, "slope": 5.0
-            }
-        },
-        {
-            "id": "cell_B",
-            "center_pixel_coords": (80, 20),
-            "prev_radar_features_raw": {
-                "Rmj": 10.0, "Rmn": 3.0, "Theta": 60.0, "MeanZ": 30.0, "Area": 40.0,
-                "Volume": 100.0, "Top": 8.0, "Base": 0.5, "MaxZ": 45.0, "MaxZhg": 4.0,
-                "AvgVIL": 1.0, "MaxVIL": 3.0, "U": 12.0, "V": 8.0, "Direction": 33.0,
-                "MeanRR_prev": 5.0, "Top10%_prev": 10.0
-            },
-            "current_topographic_features_raw": {
-                "dist_to_sea": 10.0, "elevation": 50.0, "aspect": 90.0, "roughness": 0.8, "slope": 10.0
-            }
-        }
-    ]
-    return dummy_cells
-
-def derive_all_variables(storm_cell_data: dict, radar_composite: np.ndarray, current_topographic_features: dict):
-    """
-    [cite_start]PLACEHOLDER: Derives all 17 radar variables from the radar composite [cite: 9]
-    and combines them with 5 topographic variables for a given storm cell.
-    Returns a dictionary of all 22 input features for ML models.
-    """
-    print(f"Simulating derivation of 22 variables for cell: {storm_cell_data['id']}")
-    # This is where the paper's Table I variables are computed based on the cell's area.
-    # e.g., using functions to calculate MeanZ, Volume, AvgVIL etc.
-
-    combined_features = {
-        **storm_cell_data["prev_radar_features_raw"],
-        **current_topographic_features
+        vil = np.zeros(len(profiles))
+    avg_vil = np.add.reduceat(vil, starts) / counts
+    max_vil = np.maximum.reduceat(vil, starts)
+
+    # --- Motion and lagged rain rates ---
+    if motion is None:
+        motion = np.zeros((n_cells, 2), dtype=np.float32)
+    if prev_rain_rates is None:
+        prev_rain_rates = _rain_rates_from_profiles(profiles, storm_cells)
+    u, v = motion[:, 0], motion[:, 1]
+    # Direction of travel, deg counter-clockwise from east (the convention of the training data)
+    direction = np.degrees(np.arctan2(v, u)) % 360.0
+
+    columns = {
+        "Rmj": rmj, "Rmn": rmn, "Theta": theta, "MeanZ": mean_z,
+        "Area": counts * pixel_km * pixel_km, "Volume": volume,
+        "Top": np.where(cell_top >= 0, heights[np.clip(cell_top, 0, n_levels - 1)], 0.0),
+        "Base": np.where(cell_base < n_levels, heights[np.clip(cell_base, 0, n_levels - 1)], 0.0),
+        "MaxZ": max_z, "MaxZhg": max_z_hg, "AvgVIL": avg_vil, "MaxVIL": max_vil,
+        "U": u, "V": v, "Direction": direction,
+        "MeanRR_prev": prev_rain_rates[:, 0], "Top10%_prev": prev_rain_rates[:, 1],
     }
-    return combined_features
+    for column_index, variable in enumerate(settings.RADAR_VARIABLES):
+        features[:, column_index] = columns[variable]
+    return features
+
+
+def derive_all_variables(
+    storm_cells: StormCellTable,
+    radar_composite: np.ndarray,
+    topographic_features: np.ndarray = None,
+    motion: np.ndarray = None,
+    prev_rain_rates: np.ndarray = None,
+) -> pd.DataFrame:
+    """
+    [cite_start]Derives all 17 radar variables from the radar composite [cite: 9]
+    and combines them with the 5 topographic variables for every storm cell.
+    Returns one DataFrame (one row per cell, in table order) whose columns are
+    settings.RADAR_VARIABLES followed by settings.TOPOGRAPHIC_VARIABLES.
+    Topographic variables default to a lookup in the cached terrain rasters
+    at the cell centres.
+    """
+    print(f"Deriving {len(settings.RADAR_VARIABLES) + len(settings.TOPOGRAPHIC_VARIABLES)} variables for {len(storm_cells)} cells")
+    radar_features = extract_radar_features(radar_composite, storm_cells, motion=motion, prev_rain_rates=prev_rain_rates)
+    if topographic_features is None:
+        topographic_features = topography_cache.lookup(storm_cells.center_pixel_coords)
+    return pd.DataFrame(
+        np.hstack((radar_features, topographic_features.astype(np.float32, copy=False))),
+        columns=settings.RADAR_VARIABLES + settings.TOPOGRAPHIC_VARIABLES,
+        index=storm_cells.cell_ids,
+    )
 
 
-def categorize_storm_cell(storm_cell_features: dict) -> str:
+def classify_mcs_types(features: np.ndarray) -> np.ndarray:
     """
-    [cite_start]PLACEHOLDER: Categorizes a storm cell into CC, MCC, SLD, or SLP[cite: 89].
-    Based on longest radius (Rmj), axis ratio, and advection angle.
+    [cite_start]Categorizes every storm cell into CC, MCC, SLD or SLP in one vectorized pass[cite: 89].
+    ``features`` is the (N, 17+) feature matrix whose leading columns follow
+    settings.RADAR_VARIABLES. Rules, based on the longest radius (Rmj), the
+    axis ratio (Rmn / Rmj) and the advection angle between the major axis
+    and the direction of travel:
+      - CC:  Rmj < MCS_CC_MAX_RADIUS_KM [cite: 90]
+      - MCC: larger, near-circular systems (axis ratio >= MCS_LINEAR_AXIS_RATIO)
+      - SLP: linear systems moving along the line (advection angle < MCS_PARALLEL_MAX_ANGLE_DEG)
+      - SLD: linear systems moving across the line [cite: 91, 92], and linear
+        systems without motion (new or untracked cells, U = V = 0), whose
+        advection angle is undefined
+    Returns an (N,) array of type strings.
     """
-    # Simplified dummy categorization
-    rmj = storm_cell_features.get("Rmj", 0)
-    if rmj < 20: # [cite: 90]
-        return "CC"
-    # [cite_start]More logic for MCC, SLD, SLP would go here [cite: 91, 92]
-    return "MSL" # Defaulting to MSL for anything non-CC, for regression models
+    features = np.asarray(features)
+    column = {name: i for i, name in enumerate(settings.RADAR_VARIABLES)}
+    rmj = features[:, column["Rmj"]].astype(np.float64)
+    rmn = features[:, column["Rmn"]].astype(np.float64)
+    theta = features[:, column["Theta"]].astype(np.float64)        # major axis, deg counter-clockwise from east
+    direction = features[:, column["Direction"]].astype(np.float64)  # travel, deg counter-clockwise from east
+    speed = np.hypot(features[:, column["U"]].astype(np.float64), features[:, column["V"]].astype(np.float64))
+
+    axis_ratio = np.divide(rmn, rmj, out=np.ones_like(rmj), where=rmj > 0)
+    # Travel as an axis angle (same frame as Theta), then fold the difference to [0, 90]
+    travel_axis = direction % 180.0
+    advection_angle = np.abs(theta - travel_axis) % 180.0
+    advection_angle = np.minimum(advection_angle, 180.0 - advection_angle)
+
+    is_cc = rmj < settings.MCS_CC_MAX_RADIUS_KM
+    is_linear = axis_ratio < settings.MCS_LINEAR_AXIS_RATIO
+    is_stationary = speed == 0.0
+    is_parallel = advection_angle < settings.MCS_PARALLEL_MAX_ANGLE_DEG
+    return np.select(
+        [is_cc, ~is_linear, is_stationary, is_parallel],
+        ["CC", "MCC", "SLD", "SLP"],
+        default="SLD",
+    )
 
-def generate_image_patch(radar_composite: np.ndarray, center_coords: tuple) -> np.ndarray:
+
+def group_cells_by_mcs_type(mcs_types: np.ndarray) -> Dict[str, np.ndarray]:
+    """Row indices of the cells of each MCS type, for batched per-type inference."""
+    mcs_types = np.asarray(mcs_types)
+    unique_types, inverse = np.unique(mcs_types, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(unique_types)))[:-1]
+    return {str(mcs_type): indices for mcs_type, indices in zip(unique_types, np.split(order, bounds))}
+
+
+def generate_image_patches(
+    radar_composite: np.ndarray,
+    center_coords: np.ndarray,
+    patch_size: int = 81,
+    binary: bool = True,
+) -> np.ndarray:
     """
-    [cite_start]PLACEHOLDER: Generates an 81x81 image patch around the central pixel [cite: 129]
-    for the classification model.
+    [cite_start]Generates the 81x81 image patches around the central pixel of every cell [cite: 129]
+    as one (N, patch_size, patch_size) array; the nowcasting cycle archives
+    them as retraining samples (RADAR_ARCHIVE_PATCHES).
+    The composite (or its column maximum, for 3D input) is padded once by half
+    a patch on every side, so patches near the edges are filled with "no
+    echo"; the patches are then gathered from a strided window view with a
+    single fancy-indexing step. With ``binary=True`` patches are uint8 echo
+    masks (1 where reflectivity >= STORM_REFLECTIVITY_THRESHOLD_DBZ),
+    otherwise float32 reflectivity padded with 0 dBZ.
     """
-    print(f"Simulating image patch generation for center: {center_coords}")
-    # This involves extracting a sub-array from the larger radar_composite
-    # ensuring appropriate padding if near edges.
-    patch_size = 81
-    start_row = max(0, center_coords[0] - patch_size // 2)
-    end_row = min(radar_composite.shape[0], center_coords[0] + patch_size // 2 + 1)
-    start_col = max(0, center_coords[1] - patch_size // 2)
-    end_col = min(radar_composite.shape[1], center_coords[1] + patch_size // 2 + 1)
+    center_coords = np.asarray(center_coords, dtype=np.int64).reshape(-1, 2)
+    composite = column_maximum(radar_composite)
+    if binary:
+        image = (composite >= settings.STORM_REFLECTIVITY_THRESHOLD_DBZ).astype(np.uint8)
+    else:
+        image = composite.astype(np.float32, copy=False)
 
-    # Create a dummy binary patch (1 for storm, 0 for no storm)
-    dummy_patch = np.zeros((patch_size, patch_size), dtype=int)
-    # Simulate some "storm" in the center
-    dummy_patch[30:50, 30:50] = 1
-    return dummy_patch
\ No newline at end of file
+    half = patch_size // 2
+    padded = np.pad(image, half, mode="constant", constant_values=0)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (patch_size, patch_size))
+    # Window (r, c) of the padded image is centred on pixel (r, c) of the original
+    rows = np.clip(center_coords[:, 0], 0, image.shape[0] - 1)
+    cols = np.clip(center_coords[:, 1], 0, image.shape[1] - 1)
+    return windows[rows, cols]
@@ -0,0 +1,142 @@
+# backend/app/services/feature_store.py
+import os
+import tempfile
+from typing import Iterator, List
+import numpy as np
+import pandas as pd
+from app.config import settings
+from app.services.radar_frame_store import compute_frame_fingerprint
+
+# Training targets, stored as float32 next to RADAR_VARIABLES
+TARGET_COLUMNS = ['is_heavy_rainfall', 'mean_rainfall_rate_mmh', 'top10_mean_rr_mmh']
+# Extension of the columnar (Arrow IPC file format) copy of an upload
+COLUMNAR_EXTENSION = ".arrow"
+
+
+def _float32_columns() -> List[str]:
+    return list(settings.RADAR_VARIABLES) + TARGET_COLUMNS
+
+
+def columnar_path_for(content_hash: str) -> str:
+    return os.path.join(settings.FEATURE_STORE_DIR, f"{content_hash}{COLUMNAR_EXTENSION}")
+
+
+def _record_batches_from_csv(source_path: str) -> Iterator:
+    """Streams a CSV as Arrow record batches, features and targets typed as float32."""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    column_types = {column: pa.float32() for column in _float32_columns()}
+    reader = pa_csv.open_csv(source_path, convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    for batch in reader:
+        yield batch
+
+
+def _frame_from_npy(source_path: str) -> pd.DataFrame:
+    """
+    A structured array keeps its field names; a plain 2-D array must hold
+    cell_id followed by the RADAR_VARIABLES columns.
+    """
+    array = np.load(source_path, mmap_mode="r", allow_pickle=False)
+    if array.dtype.names:
+        return pd.DataFrame({name: array[name] for name in array.dtype.names})
+    columns = ['cell_id'] + list(settings.RADAR_VARIABLES)
+    if array.ndim != 2 or array.shape[1] != len(columns):
+        raise ValueError(f"Unsupported .npy layout {array.shape}: expected (rows, {len(columns)}) "
+                         f"with columns {columns}, or a structured array")
+    frame = pd.DataFrame(np.asarray(array), columns=columns)
+    if np.all(np.mod(frame['cell_id'], 1) == 0):
+        frame['cell_id'] = frame['cell_id'].astype(np.int64)
+    return frame
+
+
+def _read_frame(source_path: str) -> pd.DataFrame:
+    extension = os.path.splitext(source_path)[1].lower()
+    if extension in (".xlsx", ".xls"):
+        return pd.read_excel(source_path)
+    if extension == ".json":
+        try:
+            return pd.read_json(source_path)
+        except ValueError:
+            return pd.read_json(source_path, lines=True)
+    if extension == ".npy":
+        return _frame_from_npy(source_path)
+    raise ValueError(f"Unsupported training data format '{extension}'")
+
+
+def _typed_table(frame: pd.DataFrame):
+    import pyarrow as pa
+    float32_columns = [c for c in _float32_columns() if c in frame.columns]
+    frame = frame.astype({column: np.float32 for column in float32_columns})
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def convert_to_columnar(source_path: str) -> dict:
+    """
+    Converts an uploaded training file (CSV, Excel, JSON or NPY) once into an
+    Arrow IPC file in FEATURE_STORE_DIR, named by the BLAKE2b hash of the
+    upload's content, so re-uploads of the same file share one copy.
+    RADAR_VARIABLES and target columns are stored as float32. CSVs are
+    converted batch by batch without loading the whole file.
+
+    Returns the fields recorded on the dataset document: ``columnar_path``,
+    ``content_hash``, ``row_count`` and ``schema``.
+    """
+    import pyarrow as pa
+
+    content_hash = compute_frame_fingerprint(source_path)["content_hash"]
+    columnar_path = columnar_path_for(content_hash)
+    if not os.path.exists(columnar_path):
+        os.makedirs(settings.FEATURE_STORE_DIR, exist_ok=True)
+        # A unique temp file, so concurrent conversions of the same content never share one
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{content_hash}.", suffix=".tmp", dir=settings.FEATURE_STORE_DIR)
+        os.close(fd)
+        try:
+            if source_path.lower().endswith(".csv"):
+                batches = _record_batches_from_csv(source_path)
+                first = next(batches, None)
+                if first is None:
+                    raise ValueError(f"{source_path} has no rows")
+                schema = first.schema
+                with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                    writer.write_batch(first)
+                    for batch in batches:
+                        writer.write_batch(batch)
+            else:
+                table = _typed_table(_read_frame(source_path))
+                with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table, max_chunksize=settings.TRAINING_CHUNK_ROWS)
+            os.replace(tmp_path, columnar_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    with pa.memory_map(columnar_path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        schema = reader.schema
+        row_count = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return {
+        "columnar_path": columnar_path,
+        "content_hash": content_hash,
+        "row_count": row_count,
+        "schema": [{"name": field.name, "type": str(field.type)} for field in schema],
+    }
+
+
+def columnar_columns(columnar_path: str) -> List[str]:
+    import pyarrow as pa
+    with pa.memory_map(columnar_path, "r") as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def iter_columnar_chunks(columnar_path: str, columns: List[str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Reads ``columns`` of an Arrow IPC file through a memory map, at most
+    ``chunk_rows`` rows at a time; only the pages of those columns are read.
+    """
+    import pyarrow as pa
+    with pa.memory_map(columnar_path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(columns)
+            for offset in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(offset, chunk_rows).to_pandas()
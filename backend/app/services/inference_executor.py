@@ -0,0 +1,164 @@
+# backend/app/services/inference_executor.py
+import asyncio
+import functools
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from fastapi import HTTPException
+from app.config import settings
+
+# --- Worker side (process pool) ---
+
+_worker_service = None
+
+
+def _init_worker():
+    """Each worker process serves from its own MLModelService (models load lazily on first use)."""
+    global _worker_service
+    from app.services.ml_service import MLModelService
+    _worker_service = MLModelService()
+    _worker_service.load_models()
+
+
+def _call_worker_service(method_name: str, args: tuple, kwargs: dict):
+    # A worker started before any models were trained re-indexes them once they exist
+    if not _worker_service.models_trained:
+        _worker_service.load_models()
+    return getattr(_worker_service, method_name)(*args, **kwargs)
+
+
+class InferenceExecutor:
+    """
+    Runs model inference off the asyncio event loop.
+
+    INFERENCE_EXECUTOR selects a thread pool (default; NumPy and TensorFlow
+    release the GIL in their kernels) or a process pool whose workers each
+    hold their own MLModelService. At most INFERENCE_MAX_PENDING calls are
+    queued or running; further callers wait up to
+    INFERENCE_QUEUE_TIMEOUT_S for a slot and then get a 503, so a burst of
+    requests cannot build an unbounded backlog behind the nowcasting cycle.
+    """
+
+    def __init__(self, kind: str = None, max_workers: int = None, max_pending: int = None):
+        self.kind = (kind or settings.INFERENCE_EXECUTOR).lower()
+        if self.kind not in ("thread", "process"):
+            raise ValueError(f"INFERENCE_EXECUTOR must be 'thread' or 'process', got '{self.kind}'")
+        self.max_workers = max_workers or settings.INFERENCE_MAX_WORKERS
+        self.max_pending = max_pending or settings.INFERENCE_MAX_PENDING
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._metrics = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+                         "max_pending": 0, "total_run_seconds": 0.0}
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    async def run_method(self, service, method_name: str, *args, **kwargs):
+        """Awaits ``service.<method_name>(*args, **kwargs)`` on the pool."""
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=settings.INFERENCE_QUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            self._metrics["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Inference queue is full. Try again shortly.")
+
+        self._pending += 1
+        self._metrics["submitted"] += 1
+        self._metrics["max_pending"] = max(self._metrics["max_pending"], self._pending)
+        started = time.perf_counter()
+        try:
+            if self.kind == "process":
+                call = functools.partial(_call_worker_service, method_name, args, kwargs)
+            else:
+                call = functools.partial(getattr(service, method_name), *args, **kwargs)
+            result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), call)
+            self._metrics["completed"] += 1
+            return result
+        except Exception:
+            self._metrics["failed"] += 1
+            raise
+        finally:
+            self._metrics["total_run_seconds"] += time.perf_counter() - started
+            self._pending -= 1
+            slots.release()
+
+    def metrics(self) -> dict:
+        return {"kind": self.kind, "max_workers": self.max_workers, "pending": self._pending, **self._metrics}
+
+    def recycle(self):
+        """
+        Retires the process pool after the models were reloaded in the parent;
+        calls already running finish on the old workers, new calls start
+        fresh workers that load the new models. A thread pool shares the
+        parent's MLModelService and is kept.
+        """
+        if self.kind == "process" and self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how long the event loop is blocked: a task sleeps for a fixed
+    interval and records how late it wakes up. Lags above
+    EVENT_LOOP_LAG_WARN_MS count as stalls and are logged.
+    """
+
+    def __init__(self, interval_s: float = None, warn_ms: float = None):
+        self.interval_s = interval_s or settings.EVENT_LOOP_LAG_INTERVAL_S
+        self.warn_ms = warn_ms or settings.EVENT_LOOP_LAG_WARN_MS
+        self._task: Optional[asyncio.Task] = None
+        self._metrics = {"last_lag_ms": 0.0, "max_lag_ms": 0.0, "stalls": 0, "blocked_seconds": 0.0, "samples": 0}
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            lag_ms = max(loop.time() - expected, 0.0) * 1000.0
+            self._metrics["samples"] += 1
+            self._metrics["last_lag_ms"] = lag_ms
+            self._metrics["max_lag_ms"] = max(self._metrics["max_lag_ms"], lag_ms)
+            if lag_ms >= self.warn_ms:
+                self._metrics["stalls"] += 1
+                self._metrics["blocked_seconds"] += lag_ms / 1000.0
+                print(f"WARNING: Event loop blocked for {lag_ms:.0f} ms.")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def metrics(self) -> dict:
+        return dict(self._metrics)
+
+
+# Shared executor for model inference and event-loop lag monitor
+inference_executor = InferenceExecutor()
+event_loop_monitor = EventLoopLagMonitor()
@@ -0,0 +1,102 @@
+# backend/app/services/micro_batcher.py
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+from app.config import settings
+
+
+@dataclass
+class _PendingRequest:
+    features: np.ndarray  # (n, len(RADAR_VARIABLES)) float32
+    mcs_types: np.ndarray
+    future: asyncio.Future
+
+
+class NowcastMicroBatcher:
+    """
+    Coalesces concurrent on-demand nowcast requests into batched model calls.
+
+    Requests for the same forecast time are queued until
+    NOWCAST_BATCH_MAX_WAIT_MS has passed since the first one or
+    NOWCAST_BATCH_MAX_ROWS rows are waiting, then the whole batch goes
+    through MLModelService once (which runs one forward pass per model key)
+    and every caller's future is resolved with its own rows. Under a burst
+    the models see a few large batches instead of many single rows.
+    """
+
+    def __init__(self, ml_service, max_wait_ms: float = None, max_rows: int = None):
+        self.ml_service = ml_service
+        self.max_wait_s = (settings.NOWCAST_BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self.max_rows = max_rows or settings.NOWCAST_BATCH_MAX_ROWS
+        self._pending: Dict[str, List[_PendingRequest]] = {}
+        self._pending_rows: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self._metrics = {"requests": 0, "rows": 0, "batches": 0, "max_batch_rows": 0}
+
+    async def submit(self, features: np.ndarray, mcs_types: np.ndarray, forecast_time: str) -> np.ndarray:
+        """
+        Queues ``features`` (rows in settings.RADAR_VARIABLES order) and waits for
+        its batch. Returns an (n, 3) array: storm cell predicted (0/1), MeanRR
+        and Top10% in mm/h (NaN where no storm cell is predicted or no model exists).
+        """
+        loop = asyncio.get_running_loop()
+        request = _PendingRequest(
+            features=np.asarray(features, dtype=np.float32), mcs_types=np.asarray(mcs_types), future=loop.create_future()
+        )
+        self._pending.setdefault(forecast_time, []).append(request)
+        self._pending_rows[forecast_time] = self._pending_rows.get(forecast_time, 0) + len(request.features)
+        self._metrics["requests"] += 1
+
+        if self._pending_rows[forecast_time] >= self.max_rows:
+            self._flush(forecast_time)
+        elif forecast_time not in self._timers:
+            self._timers[forecast_time] = loop.call_later(self.max_wait_s, self._flush, forecast_time)
+        return await request.future
+
+    def _flush(self, forecast_time: str):
+        timer = self._timers.pop(forecast_time, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._pending.pop(forecast_time, [])
+        self._pending_rows.pop(forecast_time, None)
+        if requests:
+            task = asyncio.get_running_loop().create_task(self._run_batch(forecast_time, requests))
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, forecast_time: str, requests: List[_PendingRequest]):
+        features = np.concatenate([r.features for r in requests])
+        mcs_types = np.concatenate([r.mcs_types for r in requests])
+        self._metrics["batches"] += 1
+        self._metrics["rows"] += len(features)
+        self._metrics["max_batch_rows"] = max(self._metrics["max_batch_rows"], len(features))
+        try:
+            results = np.full((len(features), 3), np.nan)
+            is_storm_cell = await self.ml_service.predict_storm_location_batch_async(
+                features=features, mcs_types=mcs_types, forecast_time=forecast_time
+            )
+            results[:, 0] = is_storm_cell
+            predicted_rows = np.flatnonzero(is_storm_cell)
+            if len(predicted_rows):
+                results[predicted_rows, 1:] = await self.ml_service.predict_rain_rates_batch_async(
+                    features=features[predicted_rows], mcs_types=mcs_types[predicted_rows],
+                    forecast_time=forecast_time, model_name='ann', rain_rate_types=('MeanRR', 'Top10%'),
+                )
+        except Exception as e:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in requests:
+            n_rows = len(request.features)
+            if not request.future.done():  # the caller may have gone away
+                request.future.set_result(results[offset:offset + n_rows])
+            offset += n_rows
+
+    def metrics(self) -> dict:
+        return dict(self._metrics)
@@ -1,24 +1,134 @@
 # backend/app/services/ml_service.py
+import itertools
+import json
+import multiprocessing
 import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import joblib
-import tensorflow as tf
-from tensorflow import keras
 from app.config import settings
+from app.services.data_preprocessing import group_cells_by_mcs_type
+from app.services.inference_executor import inference_executor
+from app.services.model_registry import ModelRegistry, ScalerRegistry
+from app.services.prediction_cache import PredictionCache
+from app.services.training_data import TRAINING_MCS_TYPES, TrainingDataset, load_training_dataset
+from app.services.numpy_inference import (
+    NumpyModel, export_keras_model, fold_standard_scalers, numpy_model_path, stack_linear_models,
+)
 import numpy as np
 import pandas as pd
 from fastapi import HTTPException
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import Lasso
+
+
+# TensorFlow takes seconds and hundreds of MB to import, so it is only imported
+# when a keras model is actually loaded or trained (NumPy serving never needs it)
+def _tensorflow():
+    import tensorflow as tf
+    return tf
+
+
+def _keras():
+    from tensorflow import keras
+    return keras
+
 
 class MLModelService:
-    def __init__(self):
-        self.classification_models = {}
-        self.regression_models = {}
-        self.scalers = {}
-        self.output_scalers = {}
+    def __init__(self, executor=None):
+        # Models are loaded lazily on first prediction and kept within an LRU budget
+        self.classification_models = ModelRegistry(
+            path_for=self._classification_model_path,
+            loader=self._load_keras_model,
+            discover=lambda: self._discover_models('classification_model', '_class_model.h5'),
+        )
+        self.regression_models = ModelRegistry(
+            path_for=self._regression_model_path,
+            loader=self._load_regression_model,
+            discover=lambda: self._discover_models('regression_models', '.h5', '.pkl'),
+        )
+        self.scaler_registry = ScalerRegistry()
+        # Regression models compiled with their scalers folded in, keyed like the models; each entry
+        # holds weak references to the artifacts it was compiled from so reloads invalidate it
+        self._compiled_regressors = {}
+        self._stacked_regressors = {}
+        self.executor = executor or inference_executor
+        # Per-model warm-up timings from the last load_models()
+        self.warmup_metrics = {}
+        self.prediction_cache = PredictionCache()
+        # Per-key wall-clock times of the last train_models()
+        self.training_report = {}
         self.models_trained = False
 
+    @staticmethod
+    def _servable_path(keras_model_path):
+        """The exported .npz next to a keras artifact if NumPy inference is on and it is up to date."""
+        if not settings.ML_NUMPY_INFERENCE:
+            return keras_model_path
+        npz_path = numpy_model_path(keras_model_path)
+        try:
+            if os.stat(npz_path).st_mtime_ns >= os.stat(keras_model_path).st_mtime_ns:
+                return npz_path
+        except FileNotFoundError:
+            pass
+        return keras_model_path
+
+    @classmethod
+    def _classification_model_path(cls, model_key):
+        return cls._servable_path(
+            os.path.join(settings.ML_MODELS_DIR, 'classification_model', f'{model_key}_class_model.h5')
+        )
+
+    @classmethod
+    def _regression_model_path(cls, model_key_full):
+        if not model_key_full.endswith('_ann'):
+            return os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{model_key_full}.pkl')
+        return cls._servable_path(os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{model_key_full}.h5'))
+
+    @staticmethod
+    def _load_keras_model(model_path):
+        if model_path.endswith('.npz'):
+            return NumpyModel.load(model_path)
+        keras_model = _keras().models.load_model(model_path)
+        if settings.ML_NUMPY_INFERENCE:
+            # An artifact trained before NumPy inference existed is exported once, on first use
+            try:
+                npz_path = export_keras_model(keras_model, numpy_model_path(model_path))
+                print(f"Exported {os.path.basename(model_path)} for NumPy inference.")
+                return NumpyModel.load(npz_path)
+            except Exception as e:
+                print(f"WARNING: Could not export {model_path} for NumPy inference: {e}")
+        return SignatureKerasModel.wrap(keras_model)
+
+    @classmethod
+    def _load_regression_model(cls, model_path):
+        if model_path.endswith('.pkl'):
+            return joblib.load(model_path)
+        return cls._load_keras_model(model_path)
+
+    @staticmethod
+    def _save_keras_model(model, model_path):
+        """Saves a keras model and its NumPy export (used for serving when ML_NUMPY_INFERENCE is on)."""
+        model.save(model_path)
+        try:
+            export_keras_model(model, numpy_model_path(model_path))
+        except ValueError as e:
+            print(f"WARNING: Could not export {model_path} for NumPy inference: {e}")
+
+    @staticmethod
+    def _discover_models(subdir, *suffixes):
+        model_dir = os.path.join(settings.ML_MODELS_DIR, subdir)
+        if not os.path.isdir(model_dir):
+            return []
+        keys = []
+        for filename in sorted(os.listdir(model_dir)):
+            for suffix in suffixes:
+                if filename.endswith(suffix):
+                    keys.append(filename[:-len(suffix)])
+        return keys
+
     def load_models(self):
         print(f"Loading ML models from: {settings.ML_MODELS_DIR}")
         if not os.path.exists(settings.ML_MODELS_DIR):
@@ -32,53 +142,90 @@ class MLModelService:
             self.models_trained = False
             return
 
-        # Load classification models
-        for mcs_type in settings.MCS_TYPES:
-            for forecast_time in ['30min', '60min']:
-                model_key = f'{mcs_type}_{forecast_time}'
-                model_path = os.path.join(settings.ML_MODELS_DIR, 'classification_model', f'{model_key}_class_model.h5')
-                if os.path.exists(model_path):
-                    try:
-                        self.classification_models[model_key] = keras.models.load_model(model_path)
-                        print(f"Loaded classification model: {model_key}")
-                    except Exception as e:
-                        print(f"Error loading {model_key} CNN model: {e}")
-
-        # Load regression models and scalers
-        for mcs_type in settings.MCS_TYPES_REGRESSION:
-            for forecast_time in ['30min', '60min']:
-                for rain_rate_type in ['MeanRR', 'Top10%']:
-                    scaler_key = f'{mcs_type}_{forecast_time}_{rain_rate_type}'
-                    scaler_path = os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers', f'{scaler_key}_scaler.pkl')
-                    output_scaler_path = os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers', f'{scaler_key}_output_scaler.pkl')
-
-                    if os.path.exists(scaler_path):
-                        self.scalers[scaler_key] = joblib.load(scaler_path)
-                    if os.path.exists(output_scaler_path):
-                        self.output_scalers[scaler_key] = joblib.load(output_scaler_path)
-
-                    for model_name in ['lasso', 'ann']:
-                        model_key_full = f'{scaler_key}_{model_name}'
-                        model_file_ext = '.h5' if model_name == 'ann' else '.pkl'
-                        model_path = os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{model_key_full}{model_file_ext}')
-                        
-                        if os.path.exists(model_path):
-                            try:
-                                if model_name == 'ann':
-                                    self.regression_models[model_key_full] = keras.models.load_model(model_path)
-                                else:
-                                    self.regression_models[model_key_full] = joblib.load(model_path)
-                                print(f"Loaded regression model: {model_key_full}")
-                            except Exception as e:
-                                print(f"Error loading {model_key_full} regression model: {e}")
-
-        if self.classification_models or self.regression_models:
+        # Only index the artifacts here; each model is loaded when first needed
+        classification_keys = self.classification_models.available_keys()
+        regression_keys = self.regression_models.available_keys()
+        print(f"Found {len(classification_keys)} classification and {len(regression_keys)} regression models "
+              f"(max resident: {settings.ML_MAX_RESIDENT_MODELS or 'unlimited'}).")
+
+        if settings.ML_PRELOAD_MODELS:
+            for model_key in classification_keys:
+                try:
+                    self.classification_models.get(model_key)
+                except Exception as e:
+                    print(f"Error loading {model_key} CNN model: {e}")
+            for model_key_full in regression_keys:
+                try:
+                    self.regression_models.get(model_key_full)
+                except Exception as e:
+                    print(f"Error loading {model_key_full} regression model: {e}")
+
+        # Predictions of previously loaded models must not be served again
+        self.prediction_cache.clear()
+
+        # Load all classification, input and output scalers once (they are small)
+        print(f"Loaded {self.scaler_registry.preload()} preprocessing scalers.")
+
+        if classification_keys or regression_keys:
             self.models_trained = True
+            if settings.ML_WARMUP_ENABLED:
+                # Off the startup path: the first cycles are served while the models warm up
+                threading.Thread(target=self.warm_up_models, args=(classification_keys, regression_keys),
+                                 name="model-warmup", daemon=True).start()
             print("ML Model loading complete.")
         else:
             self.models_trained = False
             print("No models could be loaded.")
 
+    def warm_up_models(self, classification_keys, regression_keys):
+        """
+        Runs dummy batches of each ML_WARMUP_BATCH_SIZES size through every
+        serving path (model load, scaler folding, graph tracing, BLAS setup) so
+        the first nowcast cycle does not pay for it. At most as many models as
+        the residency budget allows are warmed, since others would be evicted
+        again. Timings are kept in ``warmup_metrics``.
+        """
+        n_features = len(settings.RADAR_VARIABLES)
+        # Each family has its own registry holding at most ML_MAX_RESIDENT_MODELS models (0 = unlimited);
+        # a classification group loads one model and a regression group two (MeanRR and Top10%)
+        budget = settings.ML_MAX_RESIDENT_MODELS
+        classification_budget = len(classification_keys) if budget == 0 else min(budget, len(classification_keys))
+        # One group per batched call: classifiers by key, regressors by (type, horizon, model name)
+        groups = [
+            ('classification', model_key, lambda X, mcs_type=model_key.rsplit('_', 1)[0], ft=model_key.rsplit('_', 1)[1]:
+                self.predict_storm_location_batch(X, np.full(len(X), mcs_type), ft, use_cache=False))
+            for model_key in classification_keys
+        ][:classification_budget]
+        regression_groups = []
+        for model_key_full in regression_keys:
+            mcs_type, forecast_time, _, model_name = model_key_full.split('_', 3)
+            if (mcs_type, forecast_time, model_name) not in regression_groups:
+                regression_groups.append((mcs_type, forecast_time, model_name))
+        # The cycle uses the ANNs, so warm those first
+        regression_groups.sort(key=lambda group: group[2] != 'ann')
+        regression_group_budget = len(regression_groups) if budget == 0 else min(budget // 2, len(regression_groups))
+        groups += [
+            ('regression', f'{mcs_type}_{forecast_time}_{model_name}',
+             lambda X, mcs_type=mcs_type, ft=forecast_time, model_name=model_name:
+                self.predict_rain_rates_batch(X, np.full(len(X), mcs_type), ft, model_name, use_cache=False))
+            for mcs_type, forecast_time, model_name in regression_groups
+        ][:regression_group_budget]
+
+        total_started = time.perf_counter()
+        for kind, group_key, predict in groups:
+            timings = {}
+            try:
+                for batch_size in settings.ML_WARMUP_BATCH_SIZES:
+                    started = time.perf_counter()
+                    predict(np.zeros((batch_size, n_features), dtype=np.float32))
+                    timings[batch_size] = round((time.perf_counter() - started) * 1000.0, 2)
+            except Exception as e:
+                print(f"Warm-up failed for {kind} model {group_key}: {e}")
+                continue
+            self.warmup_metrics[group_key] = {"kind": kind, "batch_ms": timings}
+            print(f"Warmed up {kind} model {group_key}: " + ", ".join(f"{n} rows {ms} ms" for n, ms in timings.items()))
+        print(f"Model warm-up finished in {time.perf_counter() - total_started:.2f} s.")
+
     def _check_models_exist(self):
         classification_dir = os.path.join(settings.ML_MODELS_DIR, 'classification_model')
         regression_dir = os.path.join(settings.ML_MODELS_DIR, 'regression_models')
@@ -91,196 +238,204 @@ class MLModelService:
         
         return False
 
-    def _load_and_preprocess_data(self, radar_data_paths, labels_data_paths):
+    def _load_and_preprocess_data(self, radar_data_paths, labels_data_paths, staging_root=None) -> TrainingDataset:
+        """
+        Streams and merges the uploaded radar and labels files into an on-disk,
+        memory-mapped TrainingDataset (see load_training_dataset), so memory
+        stays bounded whatever the size of the uploads. The dataset is staged
+        under ``staging_root`` (default TRAINING_STAGING_DIR).
+        """
         print("Loading and preprocessing data...")
-        
-        radar_df = pd.concat([pd.read_csv(p) for p in radar_data_paths])
-        labels_df = pd.concat([pd.read_csv(p) for p in labels_data_paths])
-        
-        print(f"Radar data shape: {radar_df.shape}")
-        print(f"Labels data shape: {labels_df.shape}")
-        print(f"Radar columns: {radar_df.columns.tolist()}")
-        print(f"Labels columns: {labels_df.columns.tolist()}")
-        
-        # Merge dataframes on cell_id
-        merged_df = pd.merge(radar_df, labels_df, on='cell_id', suffixes=('', '_label'))
-        
-        print(f"Merged data shape: {merged_df.shape}")
-        print(f"Merged columns: {merged_df.columns.tolist()}")
-        
-        # Feature selection and engineering
-        features = settings.RADAR_VARIABLES
-        target_classification = 'is_heavy_rainfall'
-        target_regression_mean = 'mean_rainfall_rate_mmh'
-        target_regression_top10 = 'top10_mean_rr_mmh'
-
-        # Check if columns exist
-        missing_features = [f for f in features if f not in merged_df.columns]
-        if missing_features:
-            print(f"WARNING: Missing features: {missing_features}")
-            # Use only available features
-            features = [f for f in features if f in merged_df.columns]
-        
-        # Extract data
-        X = merged_df[features]
-        y_class = merged_df[target_classification]
-        y_reg_mean = merged_df[target_regression_mean]
-        y_reg_top10 = merged_df[target_regression_top10]
-        
-        # Clean data: handle NaN and infinite values
-        print(f"Checking for NaN values...")
-        print(f"  X NaN count: {X.isna().sum().sum()}")
-        print(f"  y_class NaN count: {y_class.isna().sum()}")
-        print(f"  y_reg_mean NaN count: {y_reg_mean.isna().sum()}")
-        print(f"  y_reg_top10 NaN count: {y_reg_top10.isna().sum()}")
-        
-        # Fill NaN values with column mean (for features) or 0 (for targets)
-        X = X.fillna(X.mean())
-        y_class = y_class.fillna(0)
-        y_reg_mean = y_reg_mean.fillna(0)
-        y_reg_top10 = y_reg_top10.fillna(0)
-        
-        # Replace infinite values with large finite values
-        X = X.replace([np.inf, -np.inf], np.nan).fillna(X.mean())
-        y_reg_mean = y_reg_mean.replace([np.inf, -np.inf], 0)
-        y_reg_top10 = y_reg_top10.replace([np.inf, -np.inf], 0)
-        
+        dataset = load_training_dataset(radar_data_paths, labels_data_paths,
+                                        staging_root or settings.TRAINING_STAGING_DIR or None)
         print(f"After cleaning:")
-        print(f"  X shape: {X.shape}")
-        print(f"  X NaN count: {X.isna().sum().sum()}")
-        
-        # Use mcs_type from radar data (no suffix)
-        mcs_type_col = 'mcs_type' if 'mcs_type' in merged_df.columns else 'mcs_type_label'
-        
-        return X, y_class, y_reg_mean, y_reg_top10, merged_df[mcs_type_col]
-
-
-    def train_models(self, radar_data_paths, labels_data_paths):
+        print(f"  X shape: ({len(dataset)}, {len(dataset.feature_names)})")
+        return dataset
+
+    @staticmethod
+    def _progress_callbacks(model_key, epochs, progress):
+        """keras callbacks reporting each finished epoch (loss, val_loss, elapsed time) to ``progress``."""
+        if progress is None:
+            return []
+        keras = _keras()
+        started = time.perf_counter()
+
+        def on_epoch_end(epoch, logs):
+            logs = logs or {}
+            progress({
+                "event": "epoch", "model_key": model_key, "epoch": epoch + 1, "epochs": epochs,
+                "loss": float(logs.get("loss", float("nan"))),
+                "val_loss": float(logs.get("val_loss", float("nan"))),
+                "elapsed_s": round(time.perf_counter() - started, 2),
+            })
+
+        return [keras.callbacks.LambdaCallback(on_epoch_end=on_epoch_end)]
+
+    def train_models(self, radar_data_paths, labels_data_paths, progress=None, full_retrain=False, staging_root=None):
+        """
+        Trains every classification and regression model. The (MCS type,
+        horizon[, target]) keys are independent, so each is a separate task
+        run across a process pool (see _run_training_tasks). ``progress``, if
+        given, is called with a dict per event ("model_started", "epoch",
+        "model_finished", "model_skipped", "model_failed") so a caller can
+        stream training progress.
+
+        With TRAINING_INCREMENTAL, a key whose training data fingerprint
+        matches the one saved with its artifacts is skipped, unless
+        ``full_retrain`` is set. ``staging_root`` is where the merged
+        training data is staged (see _load_and_preprocess_data).
+        """
         print("Starting real model training...")
 
-        X, y_class, y_reg_mean, y_reg_top10, mcs_types = self._load_and_preprocess_data(radar_data_paths, labels_data_paths)
+        dataset = self._load_and_preprocess_data(radar_data_paths, labels_data_paths, staging_root)
+        rows_by_mcs_type = {mcs_type: dataset.rows_for_mcs_type(mcs_type) for mcs_type in TRAINING_MCS_TYPES}
+        fingerprints = {}
+        skipped = []
+
+        def unchanged(kind, key, mcs_type, target):
+            # Fingerprints are shared by the keys training on the same rows and target
+            if (mcs_type, target) not in fingerprints:
+                fingerprints[(mcs_type, target)] = dataset.fingerprint(rows_by_mcs_type[mcs_type], target)
+            if full_retrain or not settings.TRAINING_INCREMENTAL:
+                return False
+            if _read_training_fingerprint(kind, key) != fingerprints[(mcs_type, target)] \
+                    or not all(os.path.exists(path) for path in _training_artifact_paths(kind, key)):
+                return False
+            print(f"⏭️  Skipping {key} - training data unchanged")
+            skipped.append(key)
+            if progress is not None:
+                progress({"event": "model_skipped", "model_key": key})
+            return True
 
         # Create directories
         os.makedirs(os.path.join(settings.ML_MODELS_DIR, 'classification_model'), exist_ok=True)
         os.makedirs(os.path.join(settings.ML_MODELS_DIR, 'regression_models'), exist_ok=True)
         os.makedirs(os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers'), exist_ok=True)
 
-        # Train classification models
+        tasks = []
+
+        # Classification models
         for mcs_type in settings.MCS_TYPES:
             for forecast_time in ['30min', '60min']:
                 model_key = f'{mcs_type}_{forecast_time}'
                 
                 # Check if we have data for this MCS type
-                mcs_mask = mcs_types == mcs_type
-                if mcs_mask.sum() == 0:
+                rows = rows_by_mcs_type[mcs_type]
+                if len(rows) == 0:
                     print(f"⚠️  Skipping {model_key} - no data for MCS type '{mcs_type}'")
                     continue
                 
-                print(f"Training classification model for {model_key}...")
-                print(f"  Samples for {mcs_type}: {mcs_mask.sum()}")
-
                 # Check if we have enough samples for train/test split
-                if mcs_mask.sum() < 5:
-                    print(f"⚠️  Skipping {model_key} - insufficient data (need at least 5 samples, have {mcs_mask.sum()})")
+                if len(rows) < 5:
+                    print(f"⚠️  Skipping {model_key} - insufficient data (need at least 5 samples, have {len(rows)})")
                     continue
+                if unchanged('classification', model_key, mcs_type, 'is_heavy_rainfall'):
+                    continue
+                tasks.append((_train_classification_key, model_key,
+                              (dataset, rows, fingerprints[(mcs_type, 'is_heavy_rainfall')])))
 
-                X_train, X_test, y_train, y_test = train_test_split(
-                    X[mcs_mask], y_class[mcs_mask], test_size=0.2, random_state=42
-                )
-
-                scaler = StandardScaler()
-                X_train_scaled = scaler.fit_transform(X_train)
-                
-                # Save scaler
-                scaler_path = os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers', f'{model_key}_class_scaler.pkl')
-                joblib.dump(scaler, scaler_path)
-
-                # Reshape for 1D CNN: (samples, features, 1)
-                X_train_reshaped = X_train_scaled.reshape((X_train_scaled.shape[0], X_train_scaled.shape[1], 1))
-
-                # 1D CNN Model for Classification
-                model = keras.Sequential([
-                    keras.layers.Conv1D(filters=32, kernel_size=3, activation='relu', input_shape=(X_train_scaled.shape[1], 1)),
-                    keras.layers.MaxPooling1D(pool_size=2),
-                    keras.layers.Conv1D(filters=64, kernel_size=3, activation='relu'),
-                    keras.layers.GlobalMaxPooling1D(),
-                    keras.layers.Dense(64, activation='relu'),
-                    keras.layers.Dropout(0.3),
-                    keras.layers.Dense(1, activation='sigmoid')
-                ])
-                
-                model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
-                # Use X_train_reshaped
-                model.fit(X_train_reshaped, y_train, epochs=20, batch_size=32, validation_split=0.2, verbose=1)
-                
-                model_path = os.path.join(settings.ML_MODELS_DIR, 'classification_model', f'{model_key}_class_model.h5')
-                model.save(model_path)
-                self.classification_models[model_key] = model
-
-        # Train regression models
+        # Regression models
         for mcs_type in settings.MCS_TYPES_REGRESSION:
             for forecast_time in ['30min', '60min']:
-                for rain_rate_type, y_reg in [('MeanRR', y_reg_mean), ('Top10%', y_reg_top10)]:
+                for rain_rate_type, target in [('MeanRR', 'mean_rainfall_rate_mmh'), ('Top10%', 'top10_mean_rr_mmh')]:
                     scaler_key = f'{mcs_type}_{forecast_time}_{rain_rate_type}'
                     
                     # Check if we have data for this MCS type
-                    mcs_mask = mcs_types == mcs_type
-                    if mcs_mask.sum() == 0:
+                    rows = rows_by_mcs_type[mcs_type]
+                    if len(rows) == 0:
                         print(f"⚠️  Skipping {scaler_key} - no data for MCS type '{mcs_type}'")
                         continue
                     
-                    print(f"Training regression models for {scaler_key}...")
-                    print(f"  Samples for {mcs_type}: {mcs_mask.sum()}")
-                    
                     # Check if we have enough samples
-                    if mcs_mask.sum() < 5:
-                        print(f"⚠️  Skipping {scaler_key} - insufficient data (need at least 5 samples, have {mcs_mask.sum()})")
+                    if len(rows) < 5:
+                        print(f"⚠️  Skipping {scaler_key} - insufficient data (need at least 5 samples, have {len(rows)})")
                         continue
-
-                    X_train, X_test, y_train, y_test = train_test_split(
-                        X[mcs_mask], y_reg[mcs_mask], test_size=0.2, random_state=42
-                    )
-
-                    # Input scaler
-                    scaler = StandardScaler()
-                    X_train_scaled = scaler.fit_transform(X_train)
-                    scaler_path = os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers', f'{scaler_key}_scaler.pkl')
-                    joblib.dump(scaler, scaler_path)
-                    self.scalers[scaler_key] = scaler
-
-                    # Output scaler
-                    output_scaler = StandardScaler()
-                    y_train_scaled = output_scaler.fit_transform(y_train.values.reshape(-1, 1))
-                    output_scaler_path = os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers', f'{scaler_key}_output_scaler.pkl')
-                    joblib.dump(output_scaler, output_scaler_path)
-                    self.output_scalers[scaler_key] = output_scaler
-
-                    # Lasso model
-                    lasso = Lasso(alpha=0.1)
-                    lasso.fit(X_train_scaled, y_train_scaled.ravel())
-                    model_path_lasso = os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{scaler_key}_lasso.pkl')
-                    joblib.dump(lasso, model_path_lasso)
-                    self.regression_models[f'{scaler_key}_lasso'] = lasso
-
-                    # Deep ANN model for Regression
-                    ann_model = keras.Sequential([
-                        keras.layers.Dense(128, activation='relu', input_shape=(X_train_scaled.shape[1],)),
-                        keras.layers.Dropout(0.3),
-                        keras.layers.Dense(64, activation='relu'),
-                        keras.layers.Dropout(0.2),
-                        keras.layers.Dense(32, activation='relu'),
-                        keras.layers.Dense(1)
-                    ])
-                    ann_model.compile(optimizer='adam', loss='mse', metrics=['mae'])
-                    ann_model.fit(X_train_scaled, y_train_scaled, epochs=30, batch_size=32, validation_split=0.2, verbose=1)
-                    model_path_ann = os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{scaler_key}_ann.h5')
-                    ann_model.save(model_path_ann)
-                    self.regression_models[f'{scaler_key}_ann'] = ann_model
+                    if unchanged('regression', scaler_key, mcs_type, target):
+                        continue
+                    tasks.append((_train_regression_key, scaler_key,
+                                  (dataset, rows, target, fingerprints[(mcs_type, target)])))
+
+        try:
+            report = self._run_training_tasks(tasks, progress)
+        finally:
+            dataset.cleanup()
+        report["skipped"] = skipped
+        if skipped:
+            print(f"Skipped {len(skipped)} keys with unchanged training data.")
+        if tasks and not report["keys"]:
+            raise RuntimeError(f"All {len(tasks)} training tasks failed: {report['failed']}")
 
         print("Real model training completed.")
         self.models_trained = True
         return True
 
+    def _run_training_tasks(self, tasks, progress=None) -> dict:
+        """
+        Runs (function, key, args) training tasks on TRAINING_MAX_WORKERS spawned
+        processes (0 = cores / TRAINING_THREADS_PER_WORKER), each limited to
+        TRAINING_THREADS_PER_WORKER math threads so TensorFlow does not
+        oversubscribe the cores. With a single worker the tasks run in this
+        process. A failing key is reported and does not stop the others.
+        Returns the per-key wall-clock report, also kept in ``training_report``.
+        """
+        threads_per_worker = max(1, settings.TRAINING_THREADS_PER_WORKER)
+        max_workers = settings.TRAINING_MAX_WORKERS or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        max_workers = max(1, min(max_workers, len(tasks)))
+        report_progress = progress or (lambda event: None)
+        started = time.perf_counter()
+        timings, failed = {}, {}
+        print(f"Training {len(tasks)} model keys on {max_workers} worker(s), {threads_per_worker} thread(s) each...")
+
+        def collect(key, result=None, error=None):
+            if error is not None:
+                failed[key] = str(error)
+                print(f"❌ Training {key} failed: {error}")
+                report_progress({"event": "model_failed", "model_key": key, "error": str(error)})
+            else:
+                timings[key] = result["elapsed_s"]
+                print(f"✅ Trained {key} in {result['elapsed_s']:.1f} s")
+
+        if max_workers == 1:
+            for function, key, args in tasks:
+                try:
+                    collect(key, function(key, *args, progress))
+                except Exception as e:
+                    collect(key, error=e)
+        else:
+            context = multiprocessing.get_context("spawn")
+            with context.Manager() as manager:
+                # Workers put progress events on a managed queue; a thread here relays them
+                relay_queue = manager.Queue() if progress is not None else None
+                relay_thread = None
+                if relay_queue is not None:
+                    relay_thread = threading.Thread(
+                        target=lambda: [progress(event) for event in iter(relay_queue.get, None)], daemon=True
+                    )
+                    relay_thread.start()
+                worker_progress = relay_queue.put if relay_queue is not None else None
+                with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                         initializer=_init_training_worker, initargs=(threads_per_worker,)) as pool:
+                    futures = {
+                        pool.submit(function, key, *args, worker_progress): key for function, key, args in tasks
+                    }
+                    for future in as_completed(futures):
+                        try:
+                            collect(futures[future], future.result())
+                        except Exception as e:
+                            collect(futures[future], error=e)
+                if relay_thread is not None:
+                    relay_queue.put(None)
+                    relay_thread.join()
+
+        total_s = time.perf_counter() - started
+        self.training_report = {
+            "workers": max_workers, "threads_per_worker": threads_per_worker,
+            "total_s": round(total_s, 2), "keys": timings, "failed": failed,
+        }
+        print(f"Trained {len(timings)} of {len(tasks)} keys in {total_s:.1f} s wall-clock "
+              f"({sum(timings.values()):.1f} s of per-key training time).")
+        return self.training_report
+
     def predict_storm_location(self, additional_features: pd.DataFrame, mcs_type: str, forecast_time: str) -> int:
         if not self.models_trained:
             raise HTTPException(status_code=400, detail="Models not trained yet.")
@@ -290,11 +445,10 @@ class MLModelService:
         if model is None:
             raise HTTPException(status_code=400, detail=f"Classification model for {model_key} not loaded.")
 
-        scaler_path = os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers', f'{model_key}_class_scaler.pkl')
-        if not os.path.exists(scaler_path):
+        scaler = self.scaler_registry.get(f'{model_key}_class_scaler')
+        if scaler is None:
             raise HTTPException(status_code=500, detail=f"Scaler for {model_key} not found.")
         
-        scaler = joblib.load(scaler_path)
         features_scaled = scaler.transform(additional_features)
         
         # Reshape for 1D CNN: (samples, features, 1)
@@ -314,17 +468,523 @@ class MLModelService:
         if model is None:
             raise HTTPException(status_code=400, detail=f"Regression model for {model_key_full} not loaded.")
 
-        scaler = self.scalers.get(scaler_key)
-        output_scaler = self.output_scalers.get(scaler_key)
-
-        if scaler is None or output_scaler is None:
+        predictor = self._compiled_regressor(scaler_key, model_name)
+        if predictor is None:
             raise HTTPException(status_code=500, detail=f"Scalers for {scaler_key} not found.")
 
-        processed_features = scaler.transform(input_features)
-        
-        prediction_scaled = model.predict(processed_features)
-        final_prediction = output_scaler.inverse_transform(prediction_scaled.reshape(-1, 1))[0][0]
+        # Scalers are folded into the compiled model, so this is one forward pass on raw features
+        final_prediction = np.asarray(predictor.predict(self._feature_matrix(input_features, predictor.feature_names))).reshape(-1)[0]
         return float(final_prediction)
 
+    # --- Batched inference ---
+
+    @staticmethod
+    def _regression_mcs_type(mcs_type: str) -> str:
+        # Regression models exist for CC and for mesoscale systems as a whole (MSL)
+        return mcs_type if mcs_type in settings.MCS_TYPES_REGRESSION else "MSL"
+
+    @staticmethod
+    def _take_rows(features, rows: np.ndarray):
+        return features.iloc[rows] if isinstance(features, pd.DataFrame) else np.asarray(features)[rows]
+
+    @staticmethod
+    def _feature_matrix(features, names=None) -> np.ndarray:
+        """
+        Raw input columns as float32, ordered like the model's training features.
+        DataFrames are matched by column name; arrays are assumed to follow
+        settings.RADAR_VARIABLES (or to already match ``names``).
+        """
+        if isinstance(features, pd.DataFrame):
+            columns = list(names) if names is not None else [c for c in settings.RADAR_VARIABLES if c in features.columns]
+            return features[columns].to_numpy(dtype=np.float32)
+        X = np.asarray(features, dtype=np.float32)
+        if names is not None and X.shape[1] == len(settings.RADAR_VARIABLES):
+            X = X[:, [settings.RADAR_VARIABLES.index(name) for name in names]]
+        return X
+
+    @staticmethod
+    def _standardize(X: np.ndarray, scaler) -> np.ndarray:
+        """StandardScaler.transform in float32, for columns already in the scaler's order."""
+        if scaler.mean_ is not None:
+            X = X - scaler.mean_.astype(np.float32)
+        if scaler.scale_ is not None:
+            X = X / scaler.scale_.astype(np.float32)
+        return X
+
+    @classmethod
+    def _scaled_matrix(cls, features, scaler) -> np.ndarray:
+        """Input columns ordered like the scaler's training features, standardized."""
+        return cls._standardize(cls._feature_matrix(features, getattr(scaler, "feature_names_in_", None)), scaler)
+
+    @staticmethod
+    def _run_model(model, X: np.ndarray) -> np.ndarray:
+        if hasattr(model, "coef_"):  # scikit-learn estimator
+            return np.asarray(model.predict(X)).reshape(-1)
+        return np.asarray(model.predict(X, batch_size=max(len(X), 1), verbose=0)).reshape(-1)
+
+    def predict_storm_location_batch(self, features, mcs_types, forecast_time: str, use_cache: bool = True) -> np.ndarray:
+        """
+        Storm cell location prediction for a whole frame.
+        ``features`` is an (N, F) DataFrame or array of radar variables and
+        ``mcs_types`` the per-row MCS type. Rows are grouped by model key so each
+        classifier runs one forward pass; types without a model of their own
+        use the ALL model. Returns an (N,) int8 array of 0/1 aligned with the input.
+        Rows seen recently (see PredictionCache) are not run again unless
+        ``use_cache`` is False.
+        """
+        if not self.models_trained:
+            raise HTTPException(status_code=400, detail="Models not trained yet.")
+
+        mcs_types = np.asarray(mcs_types)
+        predictions = np.zeros(len(mcs_types), dtype=np.int8)
+        for mcs_type, rows in group_cells_by_mcs_type(mcs_types).items():
+            model_key = f'{mcs_type}_{forecast_time}'
+            if model_key not in self.classification_models:
+                model_key = f'ALL_{forecast_time}'
+            model = self.classification_models.get(model_key)
+            scaler = self.scaler_registry.get(f'{model_key}_class_scaler')
+            if model is None or scaler is None:
+                print(f"Classification model or scaler for {mcs_type}_{forecast_time} not available. "
+                      f"Assuming NO storm cell for {len(rows)} cells.")
+                continue
+
+            def predict_probabilities(X, model=model, scaler=scaler):
+                X = self._standardize(X, scaler)
+                return self._run_model(model, X.reshape((X.shape[0], X.shape[1], 1)))
+
+            X = self._feature_matrix(self._take_rows(features, rows), getattr(scaler, "feature_names_in_", None))
+            if use_cache:
+                probabilities = self.prediction_cache.predict(model_key, (model, scaler), X, predict_probabilities)
+            else:
+                probabilities = predict_probabilities(X)
+            predictions[rows] = np.asarray(probabilities).reshape(-1) >= 0.5
+        return predictions
+
+    def _compiled_regressor(self, scaler_key: str, model_name: str):
+        """
+        The ``{scaler_key}_{model_name}`` regressor compiled with its input and
+        output scalers folded into its weights (see fold_standard_scalers), so
+        it maps raw features straight to mm/h. Returns None if an artifact is
+        missing. Models that cannot be folded are wrapped unfused.
+        """
+        model = self.regression_models.get(f'{scaler_key}_{model_name}')
+        scaler = self.scaler_registry.get(f'{scaler_key}_scaler')
+        output_scaler = self.scaler_registry.get(f'{scaler_key}_output_scaler')
+        if model is None or scaler is None or output_scaler is None:
+            return None
+
+        parts = (model, scaler, output_scaler)
+        cache_key = f'{scaler_key}_{model_name}'
+        cached = self._compiled_regressors.get(cache_key)
+        if cached is not None and all(ref() is part for ref, part in zip(cached[0], parts)):
+            return cached[1]
+        try:
+            predictor = fold_standard_scalers(model, scaler, output_scaler)
+        except ValueError as e:
+            print(f"Serving {cache_key} unfused: {e}")
+            predictor = _UnfusedRegressor(model, scaler, output_scaler)
+        self._compiled_regressors[cache_key] = (tuple(weakref.ref(part) for part in parts), predictor)
+        return predictor
+
+    def _stacked_regressor(self, mcs_type: str, forecast_time: str, rain_rate_types, model_name: str):
+        """
+        One model producing every rain rate type for a key, when they are all
+        linear (Lasso) and share their inputs; otherwise the per-type compiled
+        regressors. Returns (stacked model or None, list of per-type regressors).
+        """
+        predictors = [
+            self._compiled_regressor(f'{mcs_type}_{forecast_time}_{rain_rate_type}', model_name)
+            for rain_rate_type in rain_rate_types
+        ]
+        if len(predictors) < 2 or any(not isinstance(p, NumpyModel) for p in predictors):
+            return None, predictors
+
+        cache_key = (mcs_type, forecast_time, tuple(rain_rate_types), model_name)
+        cached = self._stacked_regressors.get(cache_key)
+        if cached is not None and all(ref() is p for ref, p in zip(cached[0], predictors)):
+            return cached[1], predictors
+        try:
+            stacked = stack_linear_models(predictors)
+        except ValueError:
+            stacked = None
+        self._stacked_regressors[cache_key] = (tuple(weakref.ref(p) for p in predictors), stacked)
+        return stacked, predictors
+
+    def predict_rain_rate_batch(self, features, mcs_types, forecast_time: str, rain_rate_type: str, model_name: str) -> np.ndarray:
+        """
+        Rain rate prediction (mm/h) for a whole frame, grouped by regression model key
+        so each model runs one forward pass. Non-CC types use the MSL models.
+        Returns an (N,) float array aligned with the input; rows whose model is
+        not loaded are NaN.
+        """
+        return self.predict_rain_rates_batch(features, mcs_types, forecast_time, model_name, (rain_rate_type,))[:, 0]
+
+    def predict_rain_rates_batch(self, features, mcs_types, forecast_time: str, model_name: str,
+                                 rain_rate_types=('MeanRR', 'Top10%'), use_cache: bool = True) -> np.ndarray:
+        """
+        Several rain rate types at once. Returns an (N, len(rain_rate_types))
+        array in mm/h; NaN where a model or scaler is missing. For linear
+        models all types of a key come out of a single fused matmul.
+        """
+        if not self.models_trained:
+            raise HTTPException(status_code=400, detail="Models not trained yet.")
+
+        regression_types = np.array([self._regression_mcs_type(t) for t in np.asarray(mcs_types)])
+        predictions = np.full((len(regression_types), len(rain_rate_types)), np.nan)
+        for mcs_type, rows in group_cells_by_mcs_type(regression_types).items():
+            group_features = self._take_rows(features, rows)
+            stacked, predictors = self._stacked_regressor(mcs_type, forecast_time, rain_rate_types, model_name)
+            if stacked is not None:
+                X = self._feature_matrix(group_features, stacked.feature_names)
+                cache_key = f"{mcs_type}_{forecast_time}_{'+'.join(rain_rate_types)}_{model_name}"
+                predictions[rows] = self._predict_cached(cache_key, stacked, X, use_cache)
+                continue
+            for column, (rain_rate_type, predictor) in enumerate(zip(rain_rate_types, predictors)):
+                if predictor is None:
+                    print(f"Regression model or scalers for {mcs_type}_{forecast_time}_{rain_rate_type}_{model_name} "
+                          f"not available ({len(rows)} cells).")
+                    continue
+                X = self._feature_matrix(group_features, predictor.feature_names)
+                cache_key = f'{mcs_type}_{forecast_time}_{rain_rate_type}_{model_name}'
+                predictions[rows, column] = self._predict_cached(cache_key, predictor, X, use_cache).reshape(-1)
+        return predictions
+
+    def _predict_cached(self, cache_key: str, predictor, X: np.ndarray, use_cache: bool) -> np.ndarray:
+        # Compiled predictors are rebuilt whenever a model or scaler is reloaded, so they identify the cache generation
+        if not use_cache:
+            return np.asarray(predictor.predict(X), dtype=np.float64).reshape(len(X), -1)
+        return self.prediction_cache.predict(cache_key, (predictor,), X, predictor.predict)
+
+    # --- Async wrappers (run on the inference executor, off the event loop) ---
+
+    async def predict_storm_location_batch_async(self, features, mcs_types, forecast_time: str) -> np.ndarray:
+        return await self.executor.run_method(self, 'predict_storm_location_batch', features, mcs_types, forecast_time)
+
+    async def predict_rain_rates_batch_async(self, features, mcs_types, forecast_time: str, model_name: str,
+                                             rain_rate_types=('MeanRR', 'Top10%')) -> np.ndarray:
+        return await self.executor.run_method(
+            self, 'predict_rain_rates_batch', features, mcs_types, forecast_time, model_name, rain_rate_types
+        )
+
     def are_models_trained(self) -> bool:
         return self.models_trained
+
+
+# --- Training tasks (module level, so a process pool can run them) ---
+
+def _init_training_worker(threads_per_worker: int):
+    """Caps the math libraries' thread pools of a training worker before TensorFlow starts."""
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+        os.environ[variable] = str(threads_per_worker)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    tf = _tensorflow()
+    tf.config.threading.set_intra_op_parallelism_threads(threads_per_worker)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _training_fingerprint_path(kind, key):
+    subdir = 'classification_model' if kind == 'classification' else 'regression_models'
+    return os.path.join(settings.ML_MODELS_DIR, subdir, f'{key}_fingerprint.json')
+
+
+def _training_artifact_paths(kind, key):
+    """Files a trained key consists of; a key missing any of them is always retrained."""
+    scaler_dir = os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers')
+    if kind == 'classification':
+        return [os.path.join(settings.ML_MODELS_DIR, 'classification_model', f'{key}_class_model.h5'),
+                os.path.join(scaler_dir, f'{key}_class_scaler.pkl')]
+    return [os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{key}_lasso.pkl'),
+            os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{key}_ann.h5'),
+            os.path.join(scaler_dir, f'{key}_scaler.pkl'),
+            os.path.join(scaler_dir, f'{key}_output_scaler.pkl')]
+
+
+def _read_training_fingerprint(kind, key):
+    try:
+        with open(_training_fingerprint_path(kind, key)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_training_fingerprint(kind, key, fingerprint):
+    """Written last, after all of the key's artifacts, so an interrupted training is retrained."""
+    path = _training_fingerprint_path(kind, key)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(fingerprint, f)
+    os.replace(tmp_path, path)
+
+
+def _warm_start_keras_model(model_path, input_shape):
+    """The previously trained keras model at ``model_path`` if TRAINING_WARM_START is on and its input still fits."""
+    if not settings.TRAINING_WARM_START or not os.path.exists(model_path):
+        return None
+    try:
+        model = _keras().models.load_model(model_path, compile=False)
+    except Exception as e:
+        print(f"WARNING: Could not warm-start from {model_path}: {e}")
+        return None
+    return model if tuple(model.input_shape[1:]) == tuple(input_shape) else None
+
+
+def _warm_start_lasso(model_path, n_features):
+    """The previously trained Lasso, set to start from its coefficients, if TRAINING_WARM_START is on."""
+    if not settings.TRAINING_WARM_START or not os.path.exists(model_path):
+        return None
+    try:
+        lasso = joblib.load(model_path)
+    except Exception as e:
+        print(f"WARNING: Could not warm-start from {model_path}: {e}")
+        return None
+    if getattr(lasso, 'coef_', None) is None or lasso.coef_.shape != (n_features,):
+        return None
+    lasso.set_params(warm_start=True)
+    return lasso
+
+
+def _artifact_staging_dir(key):
+    """
+    Private directory for one key's new artifacts while it trains. It sits
+    under ML_MODELS_DIR (same filesystem, so publishing is an atomic rename)
+    but outside the directories that model discovery scans.
+    """
+    staging_root = os.path.join(settings.ML_MODELS_DIR, '.staging')
+    os.makedirs(staging_root, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f'{key}-', dir=staging_root)
+
+
+def _publish_artifacts(staging_dir, artifacts):
+    """
+    Moves the staged files ``[(staged path, final path), ...]`` into place
+    with os.replace, in order (models first, then their scalers), so serving
+    never reads a partly written file. Staged files that do not exist (e.g.
+    a NumPy export that was not possible) are skipped.
+    """
+    for staged_path, final_path in artifacts:
+        if os.path.exists(staged_path):
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(staged_path, final_path)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def _split_training_rows(rows):
+    """
+    Train/validation row split of one model key: the same 80/20 train/test
+    split as before, then keras' validation_split (the last 20% of the
+    training rows) done up front since fit() cannot split a tf.data pipeline.
+    """
+    from sklearn.model_selection import train_test_split
+    train_rows, test_rows = train_test_split(rows, test_size=0.2, random_state=42)
+    split_at = int(np.ceil(len(train_rows) * 0.8))
+    return train_rows, train_rows[:split_at], train_rows[split_at:]
+
+
+def _fit_scaler(chunks):
+    """StandardScaler fitted chunk by chunk (partial_fit), never holding all rows."""
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    for chunk in chunks:
+        scaler.partial_fit(chunk)
+    return scaler
+
+
+def _training_pipeline(dataset, rows, target, scaler, output_scaler=None, channels=False, shuffle=False):
+    """tf.data pipeline of standardized (X, y) batches of 32 streamed from the memory-mapped dataset."""
+    tf = _tensorflow()
+    n_features = len(dataset.feature_names)
+    epochs = itertools.count()
+    return tf.data.Dataset.from_generator(
+        lambda: dataset.batches(rows, target, 32, scaler, output_scaler, shuffle=shuffle, seed=next(epochs), channels=channels),
+        output_signature=(
+            tf.TensorSpec((None, n_features, 1) if channels else (None, n_features), tf.float32),
+            tf.TensorSpec((None, 1), tf.float32),
+        ),
+    ).prefetch(tf.data.AUTOTUNE)
+
+
+def _train_classification_key(model_key, dataset, rows, fingerprint=None, progress=None) -> dict:
+    """
+    Fits the scaler and 1D CNN classifier of one (MCS type, horizon) key,
+    publishes both once fitted, then writes its data ``fingerprint``.
+    """
+    keras = _keras()
+    report = progress or (lambda event: None)
+    started = time.perf_counter()
+    n_features = len(dataset.feature_names)
+    model_path = os.path.join(settings.ML_MODELS_DIR, 'classification_model', f'{model_key}_class_model.h5')
+    model = _warm_start_keras_model(model_path, (n_features, 1))
+    epochs = settings.TRAINING_WARM_START_EPOCHS if model is not None else 20
+    report({"event": "model_started", "model_key": model_key, "kind": "classification", "warm_start": model is not None})
+    print(f"Training classification model for {model_key}...")
+    print(f"  Samples: {len(rows)}")
+
+    train_rows, fit_rows, validation_rows = _split_training_rows(rows)
+
+    scaler = _fit_scaler(pd.DataFrame(dataset.take(chunk), columns=dataset.feature_names)
+                         for chunk in dataset.iter_chunks(train_rows))
+
+    # 1D CNN Model for Classification, fed (samples, features, 1) batches
+    if model is None:
+        model = keras.Sequential([
+            keras.layers.Conv1D(filters=32, kernel_size=3, activation='relu', input_shape=(n_features, 1)),
+            keras.layers.MaxPooling1D(pool_size=2),
+            keras.layers.Conv1D(filters=64, kernel_size=3, activation='relu'),
+            keras.layers.GlobalMaxPooling1D(),
+            keras.layers.Dense(64, activation='relu'),
+            keras.layers.Dropout(0.3),
+            keras.layers.Dense(1, activation='sigmoid')
+        ])
+    
+    model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+    model.fit(_training_pipeline(dataset, fit_rows, 'is_heavy_rainfall', scaler, channels=True, shuffle=True),
+              validation_data=_training_pipeline(dataset, validation_rows, 'is_heavy_rainfall', scaler, channels=True),
+              epochs=epochs, verbose=0, callbacks=MLModelService._progress_callbacks(model_key, epochs, progress))
+    
+    # Write the model and scaler aside, then publish them together
+    staging_dir = _artifact_staging_dir(model_key)
+    try:
+        staged_model = os.path.join(staging_dir, os.path.basename(model_path))
+        staged_scaler = os.path.join(staging_dir, 'class_scaler.pkl')
+        MLModelService._save_keras_model(model, staged_model)
+        joblib.dump(scaler, staged_scaler)
+        _publish_artifacts(staging_dir, [
+            (staged_model, model_path),
+            (numpy_model_path(staged_model), numpy_model_path(model_path)),
+            (staged_scaler, ScalerRegistry().path_for(f'{model_key}_class_scaler')),
+        ])
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    if fingerprint is not None:
+        _write_training_fingerprint('classification', model_key, fingerprint)
+
+    elapsed_s = round(time.perf_counter() - started, 2)
+    report({"event": "model_finished", "model_key": model_key, "elapsed_s": elapsed_s})
+    return {"model_key": model_key, "kind": "classification", "elapsed_s": elapsed_s}
+
+
+def _train_regression_key(scaler_key, dataset, rows, target, fingerprint=None, progress=None) -> dict:
+    """
+    Fits the scalers, Lasso and ANN of one (MCS type, horizon, target) key,
+    publishes them once all are fitted, then writes its data
+    ``fingerprint``. The ANN streams its batches;
+    Lasso (no partial fit) is fitted on this key's training rows gathered in
+    memory.
+    """
+    from sklearn.linear_model import Lasso
+    keras = _keras()
+    report = progress or (lambda event: None)
+    started = time.perf_counter()
+    n_features = len(dataset.feature_names)
+    model_path_lasso = os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{scaler_key}_lasso.pkl')
+    model_path_ann = os.path.join(settings.ML_MODELS_DIR, 'regression_models', f'{scaler_key}_ann.h5')
+    lasso = _warm_start_lasso(model_path_lasso, n_features)
+    ann_model = _warm_start_keras_model(model_path_ann, (n_features,))
+    epochs = settings.TRAINING_WARM_START_EPOCHS if ann_model is not None else 30
+    report({"event": "model_started", "model_key": scaler_key, "kind": "regression", "warm_start": ann_model is not None})
+    print(f"Training regression models for {scaler_key}...")
+    print(f"  Samples: {len(rows)}")
+
+    train_rows, fit_rows, validation_rows = _split_training_rows(rows)
+
+    # Input scaler
+    scaler = _fit_scaler(pd.DataFrame(dataset.take(chunk), columns=dataset.feature_names)
+                         for chunk in dataset.iter_chunks(train_rows))
+
+    # Output scaler
+    output_scaler = _fit_scaler(dataset.target(target, chunk).reshape(-1, 1) for chunk in dataset.iter_chunks(train_rows))
+
+    # Lasso model
+    X_train_scaled = ((dataset.take(train_rows) - scaler.mean_) / scaler.scale_).astype(np.float32)
+    y_train_scaled = (dataset.target(target, train_rows) - output_scaler.mean_[0]) / output_scaler.scale_[0]
+    if lasso is None:
+        lasso = Lasso(alpha=0.1)
+    lasso.fit(X_train_scaled, y_train_scaled)
+    lasso.set_params(warm_start=False)
+    del X_train_scaled, y_train_scaled
+
+    # Deep ANN model for Regression
+    if ann_model is None:
+        ann_model = keras.Sequential([
+            keras.layers.Dense(128, activation='relu', input_shape=(n_features,)),
+            keras.layers.Dropout(0.3),
+            keras.layers.Dense(64, activation='relu'),
+            keras.layers.Dropout(0.2),
+            keras.layers.Dense(32, activation='relu'),
+            keras.layers.Dense(1)
+        ])
+    ann_model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+    ann_model.fit(_training_pipeline(dataset, fit_rows, target, scaler, output_scaler, shuffle=True),
+                  validation_data=_training_pipeline(dataset, validation_rows, target, scaler, output_scaler),
+                  epochs=epochs, verbose=0, callbacks=MLModelService._progress_callbacks(f'{scaler_key}_ann', epochs, progress))
+    # Write the models and scalers aside, then publish them together
+    staging_dir = _artifact_staging_dir(scaler_key)
+    try:
+        staged_lasso = os.path.join(staging_dir, 'lasso.pkl')
+        staged_ann = os.path.join(staging_dir, 'ann.h5')
+        staged_scaler = os.path.join(staging_dir, 'scaler.pkl')
+        staged_output_scaler = os.path.join(staging_dir, 'output_scaler.pkl')
+        joblib.dump(lasso, staged_lasso)
+        MLModelService._save_keras_model(ann_model, staged_ann)
+        joblib.dump(scaler, staged_scaler)
+        joblib.dump(output_scaler, staged_output_scaler)
+        scaler_registry = ScalerRegistry()
+        _publish_artifacts(staging_dir, [
+            (staged_lasso, model_path_lasso),
+            (staged_ann, model_path_ann),
+            (numpy_model_path(staged_ann), numpy_model_path(model_path_ann)),
+            (staged_scaler, scaler_registry.path_for(f'{scaler_key}_scaler')),
+            (staged_output_scaler, scaler_registry.path_for(f'{scaler_key}_output_scaler')),
+        ])
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    if fingerprint is not None:
+        _write_training_fingerprint('regression', scaler_key, fingerprint)
+
+    elapsed_s = round(time.perf_counter() - started, 2)
+    report({"event": "model_finished", "model_key": scaler_key, "elapsed_s": elapsed_s})
+    return {"model_key": scaler_key, "kind": "regression", "elapsed_s": elapsed_s}
+
+
+class SignatureKerasModel:
+    """
+    A keras model served through a tf.function with a fixed input signature
+    (float32, open batch dimension). keras traces ``predict`` again for new
+    batch shapes; this is traced once, during warm-up, for every batch size.
+    ``layers`` is exposed so the weights can still be exported or folded.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.layers = model.layers
+        tf = _tensorflow()
+        signature = tf.TensorSpec(shape=(None,) + tuple(model.input_shape[1:]), dtype=tf.float32)
+        self._forward = tf.function(lambda x: model(x, training=False), input_signature=[signature])
+
+    @classmethod
+    def wrap(cls, model):
+        try:
+            return cls(model)
+        except (AttributeError, ValueError) as e:  # e.g. no defined input shape
+            print(f"Serving keras model without a fixed signature: {e}")
+            return model
+
+    def predict(self, X, batch_size: int = None, verbose: int = 0) -> np.ndarray:
+        return self._forward(np.asarray(X, dtype=np.float32)).numpy()
+
+
+class _UnfusedRegressor:
+    """Fallback for regressors whose scalers cannot be folded: scale, predict, inverse-scale."""
+
+    def __init__(self, model, scaler, output_scaler):
+        self.model = model
+        self.scaler = scaler
+        self.output_scaler = output_scaler
+        names = getattr(scaler, "feature_names_in_", None)
+        self.feature_names = None if names is None else list(names)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        # X already follows feature_names, so only the affine transform is applied here
+        X_scaled = MLModelService._standardize(X, self.scaler)
+        prediction_scaled = MLModelService._run_model(self.model, X_scaled)
+        return self.output_scaler.inverse_transform(prediction_scaled.reshape(-1, 1)).reshape(-1)
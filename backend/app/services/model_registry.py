@@ -0,0 +1,171 @@
+# backend/app/services/model_registry.py
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import joblib
+from app.config import settings
+
+
+class ScalerRegistry:
+    """
+    In-memory registry of the fitted preprocessing scalers, keyed by file stem
+    (e.g. ``CC_30min_class_scaler``, ``MSL_60min_Top10%_output_scaler``).
+
+    Scalers are unpickled once, normally when the models are loaded, and
+    served from memory afterwards. Every lookup compares the cached entry
+    with the file's size and mtime, so artifacts rewritten by a retrain (in
+    this or another process) are picked up on the next prediction without a
+    restart, and deleted artifacts stop being served.
+    """
+
+    def __init__(self, scaler_dir: str = None):
+        self.scaler_dir = scaler_dir or os.path.join(settings.ML_MODELS_DIR, 'preprocessing_scalers')
+        self._entries: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.scaler_dir, f'{key}.pkl')
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat_result = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat_result.st_size, stat_result.st_mtime_ns
+
+    def get(self, key: str):
+        """Returns the scaler for ``key``, reloading it if its file changed, or None if it does not exist."""
+        path = self.path_for(key)
+        signature = self._signature(path)
+        with self._lock:
+            if signature is None:
+                self._entries.pop(key, None)
+                return None
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            scaler = joblib.load(path)
+            self._entries[key] = (signature, scaler)
+            return scaler
+
+    def preload(self) -> int:
+        """Loads every scaler in the scaler directory. Returns the number of scalers registered."""
+        if not os.path.isdir(self.scaler_dir):
+            return 0
+        for filename in sorted(os.listdir(self.scaler_dir)):
+            if filename.endswith('.pkl'):
+                self.get(filename[:-len('.pkl')])
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class ModelRegistry:
+    """
+    Lazily loaded models keyed by model key, with an LRU residency budget.
+
+    Nothing is loaded up front: a model is materialized from its artifact the
+    first time it is requested, behind a per-key lock so concurrent callers
+    load it only once, while other keys stay available. Resident models are
+    kept in LRU order and the least recently used ones are dropped once the
+    count (``max_resident``) or artifact-size (``max_resident_mb``) budget is
+    exceeded; 0 disables a budget. Like ScalerRegistry, a model whose
+    artifact changed on disk is reloaded on its next use.
+    """
+
+    def __init__(self, path_for: Callable[[str], str], loader: Callable[[str], Any],
+                 discover: Callable[[], List[str]], max_resident: int = None, max_resident_mb: float = None):
+        self.path_for = path_for
+        self.loader = loader
+        self.discover = discover
+        self.max_resident = settings.ML_MAX_RESIDENT_MODELS if max_resident is None else max_resident
+        self.max_resident_mb = settings.ML_MAX_RESIDENT_MODEL_MB if max_resident_mb is None else max_resident_mb
+        self._resident: "OrderedDict[str, Tuple[Tuple[int, int], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.load_count = 0
+        self.eviction_count = 0
+
+    _signature = staticmethod(ScalerRegistry._signature)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _cached(self, key: str, signature) -> Optional[Any]:
+        with self._lock:
+            entry = self._resident.get(key)
+            if entry is not None and entry[0] == signature:
+                self._resident.move_to_end(key)
+                return entry[1]
+            return None
+
+    def _insert(self, key: str, signature, model):
+        with self._lock:
+            self._resident[key] = (signature, model)
+            self._resident.move_to_end(key)
+            self._enforce_budget(keep=key)
+
+    def _enforce_budget(self, keep: str):
+        def over_budget():
+            if self.max_resident and len(self._resident) > self.max_resident:
+                return True
+            if self.max_resident_mb:
+                resident_mb = sum(signature[0] for signature, _ in self._resident.values()) / 1e6
+                return resident_mb > self.max_resident_mb
+            return False
+
+        while len(self._resident) > 1 and over_budget():
+            oldest = next(iter(self._resident))
+            if oldest == keep:
+                break
+            del self._resident[oldest]
+            self.eviction_count += 1
+            print(f"Evicted model {oldest} from memory (LRU).")
+
+    def get(self, key: str, default=None):
+        """Returns the model for ``key``, loading it on first use, or ``default`` if it has no artifact."""
+        signature = self._signature(self.path_for(key))
+        if signature is None:
+            with self._lock:
+                self._resident.pop(key, None)
+            return default
+        model = self._cached(key, signature)
+        if model is not None:
+            return model
+
+        with self._key_lock(key):
+            # Another caller may have loaded it while we waited for the lock
+            model = self._cached(key, signature)
+            if model is not None:
+                return model
+            model = self.loader(self.path_for(key))
+            self.load_count += 1
+            self._insert(key, signature, model)
+            print(f"Loaded model on demand: {key}")
+            return model
+
+    def __contains__(self, key: str) -> bool:
+        return self._signature(self.path_for(key)) is not None
+
+    def available_keys(self) -> List[str]:
+        return self.discover()
+
+    def resident_keys(self) -> List[str]:
+        with self._lock:
+            return list(self._resident)
+
+    def metrics(self) -> dict:
+        """Resident models (least recently used first) and load/eviction counters."""
+        return {"resident": self.resident_keys(), "max_resident": self.max_resident,
+                "loads": self.load_count, "evictions": self.eviction_count}
+
+    def __bool__(self) -> bool:
+        return bool(self.available_keys())
+
+    def clear(self):
+        with self._lock:
+            self._resident.clear()
@@ -0,0 +1,228 @@
+# backend/app/services/numpy_inference.py
+import json
+import os
+import threading
+from typing import List
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Layers that do nothing at inference time
+_PASSTHROUGH_LAYERS = {"InputLayer", "Dropout"}
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    # Split by sign so exp() never overflows
+    out = np.empty_like(x)
+    positive = x >= 0
+    out[positive] = 1.0 / (1.0 + np.exp(-x[positive]))
+    exp_x = np.exp(x[~positive])
+    out[~positive] = exp_x / (1.0 + exp_x)
+    return out
+
+
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+}
+
+
+def _first(value) -> int:
+    # Keras stores 1D sizes either as an int or as a 1-tuple depending on version
+    return int(value[0]) if isinstance(value, (list, tuple)) else int(value)
+
+
+def keras_layer_specs(model) -> List[dict]:
+    """
+    Layer-by-layer description (type, hyperparameters, float32 weights) of a
+    trained Sequential keras model. Supports the layers used by this
+    project's models (Dense, Conv1D, MaxPooling1D, GlobalMaxPooling1D,
+    Dropout, Flatten); anything else raises ValueError.
+    """
+    layers = []
+    for layer in model.layers:
+        layer_type = type(layer).__name__
+        config = layer.get_config()
+        if layer_type in _PASSTHROUGH_LAYERS:
+            continue
+        spec = {"type": layer_type}
+        if layer_type in ("Dense", "Conv1D"):
+            if config.get("activation", "linear") not in _ACTIVATIONS:
+                raise ValueError(f"Unsupported activation '{config.get('activation')}' in layer {layer.name}")
+            spec["activation"] = config.get("activation", "linear")
+            if layer_type == "Conv1D":
+                if config.get("padding") != "valid" or _first(config.get("dilation_rate", 1)) != 1:
+                    raise ValueError(f"Only 'valid', undilated Conv1D layers are supported ({layer.name})")
+                spec["strides"] = _first(config.get("strides", 1))
+            weights = layer.get_weights()
+            spec["kernel"] = np.asarray(weights[0], dtype=np.float32)
+            spec["bias"] = np.asarray(weights[1] if len(weights) > 1 else np.zeros(weights[0].shape[-1]), dtype=np.float32)
+        elif layer_type == "MaxPooling1D":
+            if config.get("padding") != "valid":
+                raise ValueError(f"Only 'valid' MaxPooling1D layers are supported ({layer.name})")
+            spec["pool_size"] = _first(config["pool_size"])
+            spec["strides"] = _first(config.get("strides") or config["pool_size"])
+        elif layer_type not in ("GlobalMaxPooling1D", "Flatten"):
+            raise ValueError(f"Layer type {layer_type} is not supported by the NumPy inference engine")
+        layers.append(spec)
+    return layers
+
+
+def export_keras_model(model, npz_path: str) -> str:
+    """Exports a trained keras model to a flat .npz that NumpyModel can run without TensorFlow."""
+    layers, arrays = [], {}
+    for i, spec in enumerate(keras_layer_specs(model)):
+        for weight_name in ("kernel", "bias"):
+            if weight_name in spec:
+                arrays[f"layer{i}_{weight_name}"] = spec.pop(weight_name)
+        layers.append(spec)
+
+    arrays["layers"] = np.array(json.dumps(layers))
+    os.makedirs(os.path.dirname(npz_path) or ".", exist_ok=True)
+    # Write then rename, so a reader never sees a half-written file; the temp name is unique
+    # because several processes may export the same model on first use
+    tmp_path = f"{npz_path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, npz_path)
+    return npz_path
+
+
+class NumpyModel:
+    """
+    Forward pass of an exported model in plain NumPy (float32).
+
+    Dense layers are a single matmul; Conv1D layers gather their receptive
+    fields with sliding_window_view and contract them with the flattened
+    kernel in one matmul as well. ``predict`` mirrors keras' signature so the model
+    can be used anywhere a keras model is.
+    """
+
+    def __init__(self, layers: List[dict], feature_names: List[str] = None):
+        self.layers = layers
+        # Raw input columns, in order, for models compiled with their scalers folded in
+        self.feature_names = feature_names
+        for spec in layers:
+            if spec["type"] == "Conv1D":
+                spec["kernel_matrix"] = spec["kernel"].reshape(-1, spec["kernel"].shape[-1])
+
+    @classmethod
+    def load(cls, npz_path: str) -> "NumpyModel":
+        with np.load(npz_path) as archive:
+            layers = json.loads(str(archive["layers"]))
+            for i, spec in enumerate(layers):
+                if spec["type"] in ("Dense", "Conv1D"):
+                    spec["kernel"] = np.ascontiguousarray(archive[f"layer{i}_kernel"])
+                    spec["bias"] = np.ascontiguousarray(archive[f"layer{i}_bias"])
+        return cls(layers)
+
+    @classmethod
+    def from_keras(cls, model) -> "NumpyModel":
+        return cls(keras_layer_specs(model))
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        x = np.asarray(X, dtype=np.float32)
+        for spec in self.layers:
+            layer_type = spec["type"]
+            if layer_type == "Dense":
+                x = _ACTIVATIONS[spec["activation"]](x @ spec["kernel"] + spec["bias"])
+            elif layer_type == "Conv1D":
+                kernel = spec["kernel"]  # (width, in_channels, out_channels)
+                # (batch, steps, in_channels, width) view of every receptive field, laid out
+                # width-major (im2col) so the whole convolution is one matmul
+                windows = sliding_window_view(x, kernel.shape[0], axis=1)[:, ::spec["strides"]]
+                columns = windows.transpose(0, 1, 3, 2).reshape(len(x), windows.shape[1], -1)
+                x = _ACTIVATIONS[spec["activation"]](columns @ spec["kernel_matrix"] + spec["bias"])
+            elif layer_type == "MaxPooling1D":
+                windows = sliding_window_view(x, spec["pool_size"], axis=1)[:, ::spec["strides"]]
+                x = windows.max(axis=-1)
+            elif layer_type == "GlobalMaxPooling1D":
+                x = x.max(axis=1)
+            elif layer_type == "Flatten":
+                x = x.reshape(len(x), -1)
+        return x
+
+    def predict(self, X, batch_size: int = None, verbose: int = 0) -> np.ndarray:
+        x = np.asarray(X, dtype=np.float32)
+        if not batch_size or batch_size >= len(x):
+            return self(x)
+        return np.concatenate([self(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
+
+
+def numpy_model_path(keras_model_path: str) -> str:
+    """The exported .npz that sits next to a keras .h5 artifact."""
+    return os.path.splitext(keras_model_path)[0] + ".npz"
+
+
+# --- Scaler folding ---
+
+def _scaler_affine(scaler, n_features: int):
+    """(mean, scale) of a fitted StandardScaler as float64, with identity defaults."""
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+def fold_standard_scalers(model, input_scaler, output_scaler) -> NumpyModel:
+    """
+    Compiles ``output_scaler.inverse_transform(model(input_scaler.transform(X)))``
+    into a single NumpyModel taking raw features (in
+    ``input_scaler.feature_names_in_`` order) and returning mm/h.
+
+    The input affine transform is folded into the first Dense layer
+    (W / s, b - (m / s) W) and the output one into the last
+    (W * s_out, b * s_out + m_out), so serving costs no extra passes or
+    temporaries. A linear scikit-learn model (Lasso) becomes one Dense layer.
+    ``model`` may be a NumpyModel, a keras model or an estimator with
+    ``coef_``/``intercept_``; raises ValueError if it cannot be folded.
+    """
+    if hasattr(model, "coef_"):
+        coef = np.asarray(model.coef_, dtype=np.float64).reshape(-1)
+        layers = [{
+            "type": "Dense", "activation": "linear",
+            "kernel": coef[:, None], "bias": np.atleast_1d(np.asarray(model.intercept_, dtype=np.float64)),
+        }]
+    else:
+        source = model if isinstance(model, NumpyModel) else NumpyModel.from_keras(model)
+        layers = [dict(spec) for spec in source.layers]
+    first, last = layers[0], layers[-1]
+    if first["type"] != "Dense" or last["type"] != "Dense" or last["activation"] != "linear":
+        raise ValueError("Scalers can only be folded into models that start and end with a linear Dense layer")
+
+    kernel = np.asarray(first["kernel"], dtype=np.float64)
+    mean, scale = _scaler_affine(input_scaler, kernel.shape[0])
+    first["bias"] = np.asarray(first["bias"], dtype=np.float64) - (mean / scale) @ kernel
+    first["kernel"] = kernel / scale[:, None]
+
+    # Re-read in case the model has a single layer, which then takes both transforms
+    out_mean, out_scale = _scaler_affine(output_scaler, 1)
+    last = layers[-1]
+    last["kernel"] = np.asarray(last["kernel"], dtype=np.float64) * out_scale
+    last["bias"] = np.asarray(last["bias"], dtype=np.float64) * out_scale + out_mean
+
+    for spec in layers:
+        if spec["type"] == "Dense":
+            spec["kernel"] = np.ascontiguousarray(spec["kernel"], dtype=np.float32)
+            spec["bias"] = np.ascontiguousarray(spec["bias"], dtype=np.float32)
+    feature_names = getattr(input_scaler, "feature_names_in_", None)
+    return NumpyModel(layers, feature_names=None if feature_names is None else list(feature_names))
+
+
+def stack_linear_models(models: List[NumpyModel]) -> NumpyModel:
+    """
+    Concatenates single-Dense-layer models that share their input columns into
+    one model with an output per member, so e.g. MeanRR and Top10% for a key
+    come out of one matmul. Raises ValueError for non-linear members.
+    """
+    for model in models:
+        if len(model.layers) != 1 or model.layers[0]["type"] != "Dense" or model.layers[0]["activation"] != "linear":
+            raise ValueError("Only single linear Dense layer models can be stacked")
+        if model.feature_names != models[0].feature_names:
+            raise ValueError("Stacked models must share their input columns")
+    return NumpyModel([{
+        "type": "Dense", "activation": "linear",
+        "kernel": np.ascontiguousarray(np.concatenate([m.layers[0]["kernel"] for m in models], axis=1)),
+        "bias": np.concatenate([m.layers[0]["bias"] for m in models]),
+    }], feature_names=models[0].feature_names)
@@ -0,0 +1,127 @@
+# backend/app/services/prediction_cache.py
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.config import settings
+
+
+class PredictionCache:
+    """
+    Bounded cache of per-row model outputs, keyed by model key and a
+    quantized feature row.
+
+    Feature rows are rounded to PREDICTION_CACHE_DECIMALS decimals before
+    keying, so a slow-moving cell whose variables barely changed between two
+    runs hits the cache. Entries expire after PREDICTION_CACHE_TTL_S and the
+    least recently used ones are evicted beyond PREDICTION_CACHE_MAX_ENTRIES.
+
+    Each model key remembers (weakly) the artifacts its entries were
+    computed with; when a lookup is made with different ones (a reload or
+    retrain) the key moves to a new generation and its old entries are
+    never served again.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, decimals: int = None):
+        self.max_entries = settings.PREDICTION_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl_seconds = settings.PREDICTION_CACHE_TTL_S if ttl_seconds is None else ttl_seconds
+        self.decimals = settings.PREDICTION_CACHE_DECIMALS if decimals is None else decimals
+        self._entries: "OrderedDict[Tuple[str, int, bytes], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._generations: Dict[str, Tuple[int, Tuple[weakref.ref, ...]]] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _row_keys(self, X: np.ndarray) -> List[Optional[bytes]]:
+        """
+        Quantized key of every row, or None for a row with NaN, infinite or
+        out-of-int64-range values: those would all cast to the same integers,
+        so such rows are never served from or stored in the cache.
+        """
+        scaled = np.round(np.asarray(X, dtype=np.float64).reshape(len(X), -1) * 10.0 ** self.decimals)
+        cacheable = np.isfinite(scaled).all(axis=1) & (np.abs(scaled) < 2.0 ** 63).all(axis=1)
+        quantized = np.ascontiguousarray(np.where(cacheable[:, None], scaled, 0.0), dtype=np.int64)
+        return [row.tobytes() if ok else None for row, ok in zip(quantized, cacheable)]
+
+    def _generation(self, model_key: str, artifacts: Sequence) -> int:
+        current = self._generations.get(model_key)
+        if current is not None and len(current[1]) == len(artifacts) \
+                and all(ref() is artifact for ref, artifact in zip(current[1], artifacts)):
+            return current[0]
+        generation = current[0] + 1 if current is not None else 0
+        if current is not None:
+            self._metrics["invalidations"] += 1
+        self._generations[model_key] = (generation, tuple(weakref.ref(a) for a in artifacts))
+        return generation
+
+    def predict(self, model_key: str, artifacts: Sequence, X: np.ndarray, predict_fn) -> np.ndarray:
+        """
+        Returns ``predict_fn(X)`` as an (n, k) float array, only calling
+        ``predict_fn`` on the rows that are not cached. ``artifacts`` are the
+        objects (model, scalers, ...) the prediction depends on.
+        """
+        X = np.asarray(X)
+        if not self.enabled or len(X) == 0:
+            return np.asarray(predict_fn(X), dtype=np.float64).reshape(len(X), -1)
+
+        row_keys = self._row_keys(X)
+        now = time.monotonic()
+        cached: List = [None] * len(X)
+        with self._lock:
+            generation = self._generation(model_key, artifacts)
+            for i, row_key in enumerate(row_keys):
+                if row_key is None:
+                    continue
+                entry_key = (model_key, generation, row_key)
+                entry = self._entries.get(entry_key)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    del self._entries[entry_key]
+                    self._metrics["expirations"] += 1
+                    continue
+                self._entries.move_to_end(entry_key)
+                cached[i] = entry[1]
+            misses = np.array([value is None for value in cached], dtype=bool)
+            self._metrics["hits"] += int(len(X) - misses.sum())
+            self._metrics["misses"] += int(misses.sum())
+
+        if not misses.any():
+            return np.stack(cached).astype(np.float64)
+
+        fresh = np.asarray(predict_fn(X[misses]), dtype=np.float64).reshape(int(misses.sum()), -1)
+        results = np.empty((len(X), fresh.shape[1]), dtype=np.float64)
+        results[misses] = fresh
+        hit_rows = np.flatnonzero(~misses)
+        if len(hit_rows):
+            results[hit_rows] = np.stack([cached[i] for i in hit_rows])
+
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            for i, values in zip(np.flatnonzero(misses), fresh):
+                if row_keys[i] is None:
+                    continue
+                self._entries[(model_key, generation, row_keys[i])] = (expires_at, values)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._metrics["hits"] + self._metrics["misses"]
+            return {
+                **self._metrics,
+                "entries": len(self._entries),
+                "hit_rate": round(self._metrics["hits"] / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,217 @@
+# backend/app/services/radar_archive.py
+import json
+import os
+import shutil
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+
+
+class RadarArchive:
+    """
+    Append-only archive of radar composites for backtesting, retraining and replay.
+
+    Each UTC day is a directory holding ``frames.bin``, the zlib-compressed
+    spatial chunks of every frame written back to back, and ``index.jsonl``,
+    one line per frame with its timestamp, shape, dtype, chunk size and the
+    byte offset/length of each chunk. A chunk covers
+    RADAR_ARCHIVE_CHUNK_SIZE x RADAR_ARCHIVE_CHUNK_SIZE pixels and all
+    levels, so reading a spatial window only decompresses the chunks that
+    overlap it.
+
+    After every append, whole day partitions are pruned: those older than
+    RADAR_ARCHIVE_RETENTION_DAYS, then the oldest ones while the archive
+    exceeds RADAR_ARCHIVE_MAX_GB (the day being written is always kept).
+    """
+
+    def __init__(self, archive_dir: str = None, chunk_size: int = None, compression_level: int = None,
+                 retention_days: int = None, max_gb: float = None):
+        self.archive_dir = archive_dir or settings.RADAR_ARCHIVE_DIR
+        self.chunk_size = chunk_size or settings.RADAR_ARCHIVE_CHUNK_SIZE
+        self.compression_level = settings.RADAR_ARCHIVE_COMPRESSION_LEVEL if compression_level is None else compression_level
+        self.retention_days = settings.RADAR_ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+        self.max_bytes = (settings.RADAR_ARCHIVE_MAX_GB if max_gb is None else max_gb) * 1e9
+        self._index_cache: Dict[str, Tuple[np.ndarray, List[dict]]] = {}
+        self._lock = threading.Lock()
+
+    # --- Writing ---
+
+    def _day_dir(self, day: str) -> str:
+        return os.path.join(self.archive_dir, day)
+
+    def append(self, composite: np.ndarray, timestamp: datetime) -> dict:
+        """Compresses ``composite`` chunk by chunk and appends it under ``timestamp``."""
+        composite = np.asarray(composite)
+        if composite.ndim == 2:
+            composite = composite[:, :, None]
+        day = timestamp.strftime("%Y%m%d")
+        day_dir = self._day_dir(day)
+        os.makedirs(day_dir, exist_ok=True)
+
+        n_rows, n_cols = composite.shape[:2]
+        offsets, lengths = [], []
+        with self._lock:
+            with open(os.path.join(day_dir, "frames.bin"), "ab") as data_file:
+                position = data_file.tell()
+                for row_start in range(0, n_rows, self.chunk_size):
+                    for col_start in range(0, n_cols, self.chunk_size):
+                        chunk = np.ascontiguousarray(
+                            composite[row_start:row_start + self.chunk_size, col_start:col_start + self.chunk_size]
+                        )
+                        payload = zlib.compress(chunk.tobytes(), self.compression_level)
+                        data_file.write(payload)
+                        offsets.append(position)
+                        lengths.append(len(payload))
+                        position += len(payload)
+
+            entry = {
+                "timestamp": timestamp.isoformat(),
+                "shape": list(composite.shape),
+                "dtype": composite.dtype.str,
+                "chunk_size": self.chunk_size,
+                "offsets": offsets,
+                "lengths": lengths,
+            }
+            # The index line is written last, so a crash never indexes a partial frame
+            with open(os.path.join(day_dir, "index.jsonl"), "a") as index_file:
+                index_file.write(json.dumps(entry) + "\n")
+            self._index_cache.pop(day, None)
+
+        print(f"Archived radar frame {timestamp.isoformat()} ({sum(lengths) / 1e6:.1f} MB compressed)")
+        self.prune(keep_day=day)
+        return entry
+
+    def append_patches(self, timestamp: datetime, cell_ids: List[str], patches: np.ndarray) -> str:
+        """
+        Stores the image patches of the cells of the frame at ``timestamp``
+        (see data_preprocessing.generate_image_patches) as
+        ``patches_<HHMMSS>.npz`` in its day partition, so they are pruned with
+        the frames. Returns the file path.
+        """
+        day = timestamp.strftime("%Y%m%d")
+        day_dir = self._day_dir(day)
+        os.makedirs(day_dir, exist_ok=True)
+        path = os.path.join(day_dir, f"patches_{timestamp.strftime('%H%M%S')}.npz")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as patch_file:
+            np.savez_compressed(patch_file, timestamp=np.array(timestamp.isoformat()),
+                                cell_ids=np.asarray(cell_ids, dtype=str), patches=patches)
+        os.replace(tmp_path, path)
+        print(f"Archived {len(cell_ids)} cell patches for {timestamp.isoformat()}")
+        return path
+
+    def _days(self) -> List[str]:
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(d for d in os.listdir(self.archive_dir) if len(d) == 8 and d.isdigit())
+
+    def _day_bytes(self, day: str) -> int:
+        day_dir = self._day_dir(day)
+        return sum(os.path.getsize(os.path.join(day_dir, f)) for f in os.listdir(day_dir))
+
+    def prune(self, keep_day: str = None) -> List[str]:
+        """Deletes day partitions beyond the retention period and size cap. Returns the removed days."""
+        days = [d for d in self._days() if d != keep_day]
+        removed = []
+        if self.retention_days > 0:
+            cutoff = (datetime.utcnow() - timedelta(days=self.retention_days)).strftime("%Y%m%d")
+            removed = [d for d in days if d < cutoff]
+            days = [d for d in days if d >= cutoff]
+        if self.max_bytes > 0:
+            sizes = {d: self._day_bytes(d) for d in days}
+            total = sum(sizes.values()) + (self._day_bytes(keep_day) if keep_day in self._days() else 0)
+            for day in days:
+                if total <= self.max_bytes:
+                    break
+                removed.append(day)
+                total -= sizes[day]
+        with self._lock:
+            for day in removed:
+                shutil.rmtree(self._day_dir(day), ignore_errors=True)
+                self._index_cache.pop(day, None)
+        if removed:
+            print(f"Pruned radar archive days: {', '.join(removed)}")
+        return removed
+
+    # --- Reading ---
+
+    def _load_day_index(self, day: str) -> Tuple[np.ndarray, List[dict]]:
+        with self._lock:
+            cached = self._index_cache.get(day)
+            if cached is not None:
+                return cached
+            entries = []
+            index_path = os.path.join(self._day_dir(day), "index.jsonl")
+            if os.path.exists(index_path):
+                with open(index_path) as index_file:
+                    entries = [json.loads(line) for line in index_file if line.strip()]
+            entries.sort(key=lambda e: e["timestamp"])
+            times = np.array([np.datetime64(e["timestamp"]) for e in entries], dtype="datetime64[us]")
+            self._index_cache[day] = (times, entries)
+            return times, entries
+
+    def timestamps(self, start: datetime, end: datetime) -> List[datetime]:
+        """Timestamps of the archived frames in [start, end]."""
+        result = []
+        day = start.date()
+        while day <= end.date():
+            times, _ = self._load_day_index(day.strftime("%Y%m%d"))
+            lo = np.searchsorted(times, np.datetime64(start), side="left")
+            hi = np.searchsorted(times, np.datetime64(end), side="right")
+            result.extend(t.astype(datetime) for t in times[lo:hi])
+            day += timedelta(days=1)
+        return result
+
+    def _find_entry(self, timestamp: datetime) -> Optional[dict]:
+        times, entries = self._load_day_index(timestamp.strftime("%Y%m%d"))
+        position = np.searchsorted(times, np.datetime64(timestamp))
+        if position < len(times) and times[position] == np.datetime64(timestamp):
+            return entries[position]
+        return None
+
+    def read_window(self, timestamp: datetime, rows: slice = slice(None), cols: slice = slice(None)) -> Optional[np.ndarray]:
+        """
+        Reads the (rows, cols, levels) window of the frame archived at
+        ``timestamp``, decompressing only the chunks that overlap it.
+        Returns None if no frame was archived at that time.
+        """
+        entry = self._find_entry(timestamp)
+        if entry is None:
+            return None
+        n_rows, n_cols, n_levels = entry["shape"]
+        dtype = np.dtype(entry["dtype"])
+        chunk_size = entry["chunk_size"]
+        row_start, row_stop, _ = rows.indices(n_rows)
+        col_start, col_stop, _ = cols.indices(n_cols)
+        window = np.empty((max(row_stop - row_start, 0), max(col_stop - col_start, 0), n_levels), dtype=dtype)
+        if window.size == 0:
+            return window
+
+        chunks_per_row = -(-n_cols // chunk_size)
+        with open(os.path.join(self._day_dir(timestamp.strftime("%Y%m%d")), "frames.bin"), "rb") as data_file:
+            for chunk_row in range(row_start // chunk_size, (row_stop - 1) // chunk_size + 1):
+                for chunk_col in range(col_start // chunk_size, (col_stop - 1) // chunk_size + 1):
+                    chunk_index = chunk_row * chunks_per_row + chunk_col
+                    data_file.seek(entry["offsets"][chunk_index])
+                    r0, c0 = chunk_row * chunk_size, chunk_col * chunk_size
+                    r1, c1 = min(r0 + chunk_size, n_rows), min(c0 + chunk_size, n_cols)
+                    chunk = np.frombuffer(
+                        zlib.decompress(data_file.read(entry["lengths"][chunk_index])), dtype=dtype
+                    ).reshape(r1 - r0, c1 - c0, n_levels)
+                    # Overlap of this chunk with the requested window
+                    sr0, sr1 = max(r0, row_start), min(r1, row_stop)
+                    sc0, sc1 = max(c0, col_start), min(c1, col_stop)
+                    window[sr0 - row_start:sr1 - row_start, sc0 - col_start:sc1 - col_start] = \
+                        chunk[sr0 - r0:sr1 - r0, sc0 - c0:sc1 - c0]
+        return window
+
+    def read_frame(self, timestamp: datetime) -> Optional[np.ndarray]:
+        """Reads the whole frame archived at ``timestamp``."""
+        return self.read_window(timestamp)
+
+
+# Shared archive for the nowcasting cycle
+radar_archive = RadarArchive()
@@ -0,0 +1,137 @@
+# backend/app/services/radar_frame_store.py
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+import numpy as np
+from app.config import settings
+
+
+class RadarFrameNotFoundError(FileNotFoundError):
+    """Raised when the expected radar composite file is not present."""
+
+
+# Bytes read per step when hashing a composite
+_HASH_CHUNK_BYTES = 4 * 1024 * 1024
+
+
+def compute_frame_fingerprint(data_path: str, previous: dict = None) -> dict:
+    """
+    Fingerprint of a radar composite file: its size, mtime and a BLAKE2b hash
+    of its content. When size and mtime match ``previous`` the file is not
+    read again and the previous fingerprint is returned, so an unchanged feed
+    costs a single stat() per cycle.
+    """
+    try:
+        stat_result = os.stat(data_path)
+    except FileNotFoundError:
+        raise RadarFrameNotFoundError(f"Radar composite not found at {data_path}") from None
+
+    if previous and previous.get("path") == data_path and previous.get("size") == stat_result.st_size \
+            and previous.get("mtime_ns") == stat_result.st_mtime_ns:
+        return previous
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(data_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return {
+        "path": data_path,
+        "size": stat_result.st_size,
+        "mtime_ns": stat_result.st_mtime_ns,
+        "content_hash": digest.hexdigest(),
+    }
+
+
+@dataclass
+class RadarFrame:
+    """One radar composite, backed by a read-only memory map of its .npy file."""
+    path: str
+    data: np.ndarray   # np.memmap, (rows, cols, levels)
+    size: int
+    mtime_ns: int
+    opened_at: datetime
+    release: Optional[Callable[[], None]] = None  # frees non-file backing (e.g. shared memory) on eviction
+
+    def same_file(self, stat_result: os.stat_result) -> bool:
+        return self.size == stat_result.st_size and self.mtime_ns == stat_result.st_mtime_ns
+
+
+class RadarFrameStore:
+    """
+    Fixed-size ring buffer of the most recent radar composites.
+
+    Frames are opened with ``np.load(mmap_mode="r")`` so only the pages a
+    stage actually touches are read, and resident memory stays flat no matter
+    how large the composites are. ``current()`` and ``previous(lag)`` hand out
+    the memory maps themselves, never copies.
+
+    Producers must replace the composite atomically (write to a temporary
+    file, then ``os.replace``) so that older frames in the buffer keep
+    mapping the inode they were opened from.
+    """
+
+    def __init__(self, capacity: int = None):
+        self.capacity = max(1, capacity or settings.RADAR_FRAME_BUFFER_SIZE)
+        self._frames: List[Optional[RadarFrame]] = [None] * self.capacity
+        self._head = -1  # slot of the newest frame
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def open(self, data_path: str) -> RadarFrame:
+        """
+        Memory-maps the composite at ``data_path`` and pushes it into the buffer.
+        If the file is unchanged since the newest frame (same size and mtime),
+        that frame is returned instead of being mapped twice.
+        """
+        try:
+            stat_result = os.stat(data_path)
+        except FileNotFoundError:
+            raise RadarFrameNotFoundError(f"Radar composite not found at {data_path}") from None
+
+        newest = self.current()
+        if newest is not None and newest.path == data_path and newest.same_file(stat_result):
+            return newest
+
+        frame = RadarFrame(
+            path=data_path,
+            data=np.load(data_path, mmap_mode="r"),
+            size=stat_result.st_size,
+            mtime_ns=stat_result.st_mtime_ns,
+            opened_at=datetime.utcnow(),
+        )
+        self.push(frame)
+        return frame
+
+    def push(self, frame: RadarFrame):
+        """Adds a frame, evicting the oldest one once the buffer is full."""
+        self._head = (self._head + 1) % self.capacity
+        evicted = self._frames[self._head]
+        if evicted is not None and evicted.release is not None:
+            evicted.release()
+        self._frames[self._head] = frame
+        self._count = min(self._count + 1, self.capacity)
+
+    def current(self) -> Optional[RadarFrame]:
+        return self.previous(0)
+
+    def previous(self, lag: int = 1) -> Optional[RadarFrame]:
+        """Frame ``lag`` cycles before the newest one, or None if not buffered."""
+        if lag < 0 or lag >= self._count:
+            return None
+        return self._frames[(self._head - lag) % self.capacity]
+
+    def clear(self):
+        for frame in self._frames:
+            if frame is not None and frame.release is not None:
+                frame.release()
+        self._frames = [None] * self.capacity
+        self._head = -1
+        self._count = 0
+
+
+# Shared buffer for the nowcasting cycle
+radar_frame_store = RadarFrameStore()
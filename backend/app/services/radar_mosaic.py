@@ -0,0 +1,209 @@
+# backend/app/services/radar_mosaic.py
+import hashlib
+import json
+import multiprocessing
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.services.radar_frame_store import RadarFrameNotFoundError, compute_frame_fingerprint
+
+_GRID_FILE = "grid.json"
+
+
+# --- Reprojection index maps ---
+
+def build_index_map(target_shape: Tuple[int, int], source_shape: Tuple[int, int],
+                    source_rows: np.ndarray, source_cols: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nearest-neighbour reprojection map from one radar's native grid to the mosaic grid.
+    ``source_rows``/``source_cols`` give, for every mosaic pixel (shape
+    ``target_shape``), its fractional position on the radar grid (as produced
+    by the radar's projection; NaN outside coverage). Returns
+    (target_index, source_index): flat indices, sorted by target pixel, of
+    every mosaic pixel the radar covers and the radar pixel that feeds it.
+    """
+    rows = np.rint(np.asarray(source_rows, dtype=np.float64)).ravel()
+    cols = np.rint(np.asarray(source_cols, dtype=np.float64)).ravel()
+    inside = (rows >= 0) & (rows < source_shape[0]) & (cols >= 0) & (cols < source_shape[1])
+    target_index = np.flatnonzero(inside)
+    if target_index.size and target_index[-1] >= target_shape[0] * target_shape[1]:
+        raise ValueError("source_rows/source_cols do not match target_shape")
+    source_index = rows[inside].astype(np.int64) * source_shape[1] + cols[inside].astype(np.int64)
+    return target_index.astype(np.int64), source_index
+
+
+def save_index_map(map_dir: str, radar_id: str, target_index: np.ndarray, source_index: np.ndarray,
+                   mosaic_shape: Tuple[int, int, int]):
+    """Stores a radar's index map as two .npy files (memory-mappable) plus the mosaic grid shape."""
+    os.makedirs(map_dir, exist_ok=True)
+    np.save(os.path.join(map_dir, f"{radar_id}_target.npy"), np.asarray(target_index, dtype=np.int64))
+    np.save(os.path.join(map_dir, f"{radar_id}_source.npy"), np.asarray(source_index, dtype=np.int64))
+    with open(os.path.join(map_dir, _GRID_FILE), "w") as f:
+        json.dump({"shape": list(mosaic_shape)}, f)
+
+
+def load_mosaic_shape(map_dir: str) -> Tuple[int, int, int]:
+    with open(os.path.join(map_dir, _GRID_FILE)) as f:
+        return tuple(json.load(f)["shape"])
+
+
+# --- Shared-memory mosaic ---
+
+def _free_shared_memory(shm: shared_memory.SharedMemory):
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+@dataclass
+class RadarMosaic:
+    """
+    A composite living in shared memory; ``data`` is an array on the shared block.
+
+    Every NumPy view taken from ``data`` keeps it alive through its ``base``,
+    so the block is closed and unlinked only when ``data`` itself is
+    garbage collected, i.e. after release() and once the last view (held by
+    a tracking step or a cycle still in progress) is gone.
+    """
+    shm: shared_memory.SharedMemory
+    data: np.ndarray  # (rows, cols, levels)
+    _finalizer: weakref.finalize = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._finalizer = weakref.finalize(self.data, _free_shared_memory, self.shm)
+
+    @property
+    def freed(self) -> bool:
+        return not self._finalizer.alive
+
+    def release(self):
+        """Drops this mosaic's reference; the block is freed when no view of ``data`` remains."""
+        self.data = None
+
+
+def _mosaic_band(shm_name: str, shape: Tuple[int, int, int], dtype: str,
+                 band_start: int, band_stop: int, sources: List[Tuple[str, str, str]]):
+    """
+    Worker: fills mosaic pixels [band_start, band_stop) (flat row-major index)
+    from every radar, keeping the maximum reflectivity where radars overlap.
+    Bands are disjoint, so workers write to the shared block without locks.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        mosaic = np.ndarray((shape[0] * shape[1], shape[2]), dtype=dtype, buffer=shm.buf)
+        for tile_path, target_map_path, source_map_path in sources:
+            target_index = np.load(target_map_path, mmap_mode="r")
+            lo, hi = np.searchsorted(target_index, [band_start, band_stop])
+            if lo == hi:
+                continue
+            targets = np.asarray(target_index[lo:hi])
+            tile = np.load(tile_path, mmap_mode="r")
+            values = tile.reshape(-1, shape[2])[np.asarray(np.load(source_map_path, mmap_mode="r")[lo:hi])]
+            np.maximum(mosaic[targets], values, out=values)
+            mosaic[targets] = values
+        del mosaic
+    finally:
+        shm.close()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.RADAR_MOSAIC_MAX_WORKERS or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_mosaic_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def find_radar_tiles(tile_dir: str = None, map_dir: str = None) -> Dict[str, Tuple[str, str, str]]:
+    """Radar tiles ({radar_id}.npy) in ``tile_dir`` that have an index map in ``map_dir``."""
+    tile_dir = tile_dir or settings.RADAR_MOSAIC_TILE_DIR
+    map_dir = map_dir or settings.RADAR_MOSAIC_INDEX_MAP_DIR
+    sources = {}
+    if not os.path.isdir(tile_dir):
+        return sources
+    for filename in sorted(os.listdir(tile_dir)):
+        radar_id, ext = os.path.splitext(filename)
+        if ext != ".npy":
+            continue
+        target_map_path = os.path.join(map_dir, f"{radar_id}_target.npy")
+        source_map_path = os.path.join(map_dir, f"{radar_id}_source.npy")
+        if os.path.exists(target_map_path) and os.path.exists(source_map_path):
+            sources[radar_id] = (os.path.join(tile_dir, filename), target_map_path, source_map_path)
+        else:
+            print(f"WARNING: No reprojection index map for radar '{radar_id}'. Tile ignored.")
+    return sources
+
+
+def compute_tiles_fingerprint(sources: Dict[str, Tuple[str, str, str]], previous: dict = None) -> dict:
+    """Combined fingerprint of all radar tiles, reusing per-tile fingerprints whose files are unchanged."""
+    if not sources:
+        raise RadarFrameNotFoundError(f"No radar tiles with index maps found in {settings.RADAR_MOSAIC_TILE_DIR}")
+    previous_tiles = (previous or {}).get("tiles", {})
+    tiles = {
+        radar_id: compute_frame_fingerprint(tile_path, previous=previous_tiles.get(radar_id))
+        for radar_id, (tile_path, _, _) in sources.items()
+    }
+    combined = hashlib.blake2b(digest_size=16)
+    for radar_id in sorted(tiles):
+        combined.update(f"{radar_id}:{tiles[radar_id]['content_hash']};".encode())
+    return {"path": "mosaic", "tiles": tiles, "content_hash": combined.hexdigest()}
+
+
+def build_mosaic(sources: Dict[str, Tuple[str, str, str]] = None, mosaic_shape: Tuple[int, int, int] = None,
+                 dtype: str = "float32", n_bands: int = None) -> RadarMosaic:
+    """
+    Builds the composite from per-radar tiles across a process pool.
+    The mosaic grid is split into row bands; each worker reprojects every
+    radar into its band with the precomputed index maps and writes straight
+    into a shared-memory block, so the result is handed back without
+    pickling. The caller owns the returned RadarMosaic and must release() it.
+    """
+    if sources is None:
+        sources = find_radar_tiles()
+    if not sources:
+        raise RadarFrameNotFoundError(f"No radar tiles with index maps found in {settings.RADAR_MOSAIC_TILE_DIR}")
+    if mosaic_shape is None:
+        mosaic_shape = load_mosaic_shape(settings.RADAR_MOSAIC_INDEX_MAP_DIR)
+
+    n_pixels = mosaic_shape[0] * mosaic_shape[1]
+    itemsize = np.dtype(dtype).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=n_pixels * mosaic_shape[2] * itemsize)
+    mosaic = RadarMosaic(shm=shm, data=np.ndarray(mosaic_shape, dtype=dtype, buffer=shm.buf))
+    try:
+        mosaic.data.fill(settings.RADAR_NO_ECHO_DBZ)
+        pool = _get_pool()
+        n_bands = n_bands or (pool._max_workers * 2)
+        # Bands follow whole rows so each worker touches a contiguous region
+        row_bounds = np.linspace(0, mosaic_shape[0], n_bands + 1).astype(np.int64)
+        task_sources = list(sources.values())
+        futures = [
+            pool.submit(_mosaic_band, shm.name, mosaic_shape, dtype,
+                        int(r0) * mosaic_shape[1], int(r1) * mosaic_shape[1], task_sources)
+            for r0, r1 in zip(row_bounds[:-1], row_bounds[1:]) if r1 > r0
+        ]
+        for future in futures:
+            future.result()
+    except Exception:
+        mosaic.release()
+        raise
+    print(f"Mosaicked {len(sources)} radar tiles into {mosaic_shape} composite.")
+    return mosaic
@@ -0,0 +1,155 @@
+# backend/app/services/storm_tracker.py
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from app.config import settings
+from app.services.data_preprocessing import StormCellTable
+
+# Cost assigned to pairs outside the search radius inside a dense sub-problem
+_NO_MATCH_COST = 1e9
+
+
+@dataclass
+class TrackingResult:
+    """Per-cell tracking output, aligned with the rows of the StormCellTable."""
+    track_ids: np.ndarray        # (N,) int64, persistent across frames
+    matched: np.ndarray          # (N,) bool, False for cells that started a new track
+    motion: np.ndarray           # (N, 2) float32, (U, V) in m/s
+    prev_rain_rates: np.ndarray  # (N, 2) float32, (MeanRR, Top10%) of the previous frame in mm/h
+
+    @property
+    def cell_ids(self) -> List[str]:
+        return [f"cell_{track_id}" for track_id in self.track_ids]
+
+
+def cell_positions_km(storm_cells: StormCellTable) -> np.ndarray:
+    """Cell centroids as (x east, y north) in km on the radar grid."""
+    resolution_km = settings.RADAR_GRID_RESOLUTION_KM
+    return np.column_stack((
+        storm_cells.centroids[:, 1].astype(np.float64) * resolution_km,
+        -storm_cells.centroids[:, 0].astype(np.float64) * resolution_km,
+    ))
+
+
+def _match_cells(predicted_km: np.ndarray, current_km: np.ndarray, radius_km: float):
+    """
+    Optimal one-to-one assignment of current cells to previous cells within
+    ``radius_km`` of their advected position, minimising total distance.
+    Candidate pairs come from a KD-tree, and the Hungarian algorithm is only
+    run on the small connected groups of competing candidates.
+    Returns (current_index, previous_index) arrays of matched pairs.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if len(predicted_km) == 0 or len(current_km) == 0:
+        return empty, empty
+
+    pairs = cKDTree(current_km).sparse_distance_matrix(cKDTree(predicted_km), radius_km, output_type="ndarray")
+    if len(pairs) == 0:
+        return empty, empty
+    cur_idx = pairs["i"].astype(np.int64)
+    prev_idx = pairs["j"].astype(np.int64)
+    distance = pairs["v"]
+
+    # Bipartite graph: nodes [0, n_cur) are current cells, [n_cur, n_cur + n_prev) previous ones
+    n_cur, n_prev = len(current_km), len(predicted_km)
+    graph = coo_matrix((np.ones(len(pairs)), (cur_idx, prev_idx + n_cur)), shape=(n_cur + n_prev,) * 2)
+    _, component = connected_components(graph, directed=False)
+    edge_component = component[cur_idx]
+    edges_per_component = np.bincount(edge_component, minlength=component.max() + 1)
+
+    # Uncontested pairs (the only candidate edge in their group) match directly
+    simple = edges_per_component[edge_component] == 1
+    matched_cur = [cur_idx[simple]]
+    matched_prev = [prev_idx[simple]]
+
+    contested = np.flatnonzero(~simple)
+    order = contested[np.argsort(edge_component[contested], kind="stable")]
+    group_bounds = np.flatnonzero(np.diff(edge_component[order])) + 1
+    for group in np.split(order, group_bounds):
+        if len(group) == 0:
+            continue
+        rows, row_idx = np.unique(cur_idx[group], return_inverse=True)
+        cols, col_idx = np.unique(prev_idx[group], return_inverse=True)
+        cost = np.full((len(rows), len(cols)), _NO_MATCH_COST)
+        cost[row_idx, col_idx] = distance[group]
+        assigned_rows, assigned_cols = linear_sum_assignment(cost)
+        feasible = cost[assigned_rows, assigned_cols] < _NO_MATCH_COST
+        matched_cur.append(rows[assigned_rows[feasible]])
+        matched_prev.append(cols[assigned_cols[feasible]])
+
+    return np.concatenate(matched_cur), np.concatenate(matched_prev)
+
+
+class StormCellTracker:
+    """
+    Incremental frame-to-frame storm cell tracker.
+
+    Only the previous frame's cells (positions, motion, rain rates and track
+    ids) are kept between cycles. Each update advects the previous cells by
+    their last motion, finds candidate pairs within TRACKING_MAX_SPEED_MS x dt
+    using a KD-tree and solves the assignment, so a frame costs
+    O(cells log cells) instead of a rescan of the track history.
+    """
+
+    def __init__(self, max_speed_ms: float = None, max_gap_minutes: float = None):
+        self.max_speed_ms = max_speed_ms or settings.TRACKING_MAX_SPEED_MS
+        self.max_gap_minutes = max_gap_minutes or settings.TRACKING_MAX_GAP_MINUTES
+        self._next_track_id = 1
+        self.reset()
+
+    def reset(self):
+        """Forgets the previous frame; the next update starts new tracks for every cell."""
+        self._timestamp = None
+        self._positions_km = np.zeros((0, 2))
+        self._track_ids = np.zeros(0, dtype=np.int64)
+        self._motion = np.zeros((0, 2), dtype=np.float32)
+        self._rain_rates = np.zeros((0, 2), dtype=np.float32)
+
+    def update(self, storm_cells: StormCellTable, rain_rates: np.ndarray, timestamp: datetime) -> TrackingResult:
+        """
+        Links the cells of a new frame to the previous one and returns their
+        track ids, motion vectors and lagged rain rates. ``rain_rates`` is the
+        (N, 2) array of current (MeanRR, Top10%) from compute_rain_rates.
+        New cells get the median motion of the matched cells (or zero) and
+        their own current rain rates.
+        """
+        n_cells = len(storm_cells)
+        positions_km = cell_positions_km(storm_cells)
+        rain_rates = np.asarray(rain_rates, dtype=np.float32).reshape(n_cells, 2)
+
+        dt_seconds = (timestamp - self._timestamp).total_seconds() if self._timestamp else 0.0
+        if dt_seconds <= 0 or dt_seconds > self.max_gap_minutes * 60:
+            cur_idx = prev_idx = np.zeros(0, dtype=np.int64)
+        else:
+            predicted_km = self._positions_km + self._motion * (dt_seconds / 1000.0)
+            cur_idx, prev_idx = _match_cells(predicted_km, positions_km, self.max_speed_ms * dt_seconds / 1000.0)
+
+        matched = np.zeros(n_cells, dtype=bool)
+        matched[cur_idx] = True
+        track_ids = np.zeros(n_cells, dtype=np.int64)
+        track_ids[cur_idx] = self._track_ids[prev_idx]
+        n_new = n_cells - len(cur_idx)
+        track_ids[~matched] = np.arange(self._next_track_id, self._next_track_id + n_new)
+        self._next_track_id += n_new
+
+        motion = np.zeros((n_cells, 2), dtype=np.float32)
+        if len(cur_idx):
+            motion[cur_idx] = (positions_km[cur_idx] - self._positions_km[prev_idx]) * (1000.0 / dt_seconds)
+            motion[~matched] = np.median(motion[cur_idx], axis=0)
+
+        prev_rain_rates = rain_rates.copy()
+        prev_rain_rates[cur_idx] = self._rain_rates[prev_idx]
+
+        self._timestamp = timestamp
+        self._positions_km = positions_km
+        self._track_ids = track_ids
+        self._motion = motion
+        self._rain_rates = rain_rates
+
+        print(f"Tracked {n_cells} cells: {len(cur_idx)} continued, {n_new} new tracks.")
+        return TrackingResult(track_ids=track_ids, matched=matched, motion=motion, prev_rain_rates=prev_rain_rates)
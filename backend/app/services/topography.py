@@ -0,0 +1,130 @@
+# backend/app/services/topography.py
+import os
+import numpy as np
+from scipy import ndimage
+from app.config import settings
+
+# Values used when no terrain rasters are available
+PLACEHOLDER_TOPOGRAPHIC_FEATURES = {
+    "dist_to_sea": 50.0, "elevation": 200.0, "aspect": 180.0, "roughness": 0.3, "slope": 5.0
+}
+
+
+def compute_topographic_grids(dem: np.ndarray, sea_mask: np.ndarray, resolution_km: float = None) -> np.ndarray:
+    """
+    [cite_start]Computes the 5 topographic variables [cite: 133] on the radar grid.
+    ``dem`` holds elevations in metres and ``sea_mask`` is non-zero over sea,
+    both (rows, cols) and aligned with the radar composite (row 0 = north).
+    Returns a (5, rows, cols) float32 stack ordered like
+    settings.TOPOGRAPHIC_VARIABLES:
+    dist_to_sea (km), elevation (m), aspect (deg clockwise from north,
+    direction the slope faces), roughness (std of elevation in a 3x3
+    window, m) and slope (deg).
+    """
+    if resolution_km is None:
+        resolution_km = settings.RADAR_GRID_RESOLUTION_KM
+    dem = np.asarray(dem, dtype=np.float64)
+    sea = np.asarray(sea_mask).astype(bool)
+    if dem.shape != sea.shape:
+        raise ValueError(f"DEM shape {dem.shape} does not match sea mask shape {sea.shape}")
+
+    spacing_m = resolution_km * 1000.0
+    dz_drow, dz_dx = np.gradient(dem, spacing_m)
+    dz_dy = -dz_drow  # rows increase southwards
+    slope = np.degrees(np.arctan(np.hypot(dz_dx, dz_dy)))
+    aspect = np.degrees(np.arctan2(-dz_dx, -dz_dy)) % 360.0
+
+    mean = ndimage.uniform_filter(dem, size=3, mode="nearest")
+    mean_sq = ndimage.uniform_filter(dem * dem, size=3, mode="nearest")
+    roughness = np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+
+    # Distance from every land pixel to the nearest sea pixel (0 over sea)
+    if sea.any():
+        dist_to_sea = ndimage.distance_transform_edt(~sea) * resolution_km
+    else:
+        # No sea on the grid: the sea is at least as far as the grid diagonal
+        diagonal_km = float(np.hypot(*dem.shape)) * resolution_km
+        print(f"WARNING: Sea mask has no sea pixels; dist_to_sea capped at the grid diagonal ({diagonal_km:.1f} km).")
+        dist_to_sea = np.full(dem.shape, diagonal_km)
+
+    grids = {
+        "dist_to_sea": dist_to_sea, "elevation": dem, "aspect": aspect,
+        "roughness": roughness, "slope": slope,
+    }
+    return np.stack([grids[v] for v in settings.TOPOGRAPHIC_VARIABLES]).astype(np.float32)
+
+
+def build_topography_cache(dem_path: str, sea_mask_path: str, cache_path: str) -> str:
+    """
+    Computes the topographic grids from the DEM and sea mask (.npy) and saves
+    them as one .npy stack that can be memory-mapped. The file is written to
+    a temporary path and renamed so readers never see a partial cache.
+    """
+    grids = compute_topographic_grids(np.load(dem_path), np.load(sea_mask_path))
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp.npy"
+    np.save(tmp_path, grids)
+    os.replace(tmp_path, cache_path)
+    print(f"Topography cache written to {cache_path} with shape {grids.shape}")
+    return cache_path
+
+
+class TopographyCache:
+    """
+    Read-only, memory-mapped topographic rasters with a vectorized per-cell lookup.
+
+    Topography never changes between cycles, so the grids are computed once
+    (or whenever the DEM / sea mask files are newer than the cache) and every
+    cycle only gathers the values under the cell centres.
+    """
+
+    def __init__(self, cache_path: str = None, dem_path: str = None, sea_mask_path: str = None):
+        self.cache_path = cache_path or settings.TOPOGRAPHY_CACHE_PATH
+        self.dem_path = dem_path or settings.TOPOGRAPHY_DEM_PATH
+        self.sea_mask_path = sea_mask_path or settings.TOPOGRAPHY_SEA_MASK_PATH
+        self._grids = None
+        self._warned_missing = False
+
+    def _sources_exist(self) -> bool:
+        return os.path.exists(self.dem_path) and os.path.exists(self.sea_mask_path)
+
+    def _cache_is_stale(self) -> bool:
+        if not os.path.exists(self.cache_path):
+            return True
+        if not self._sources_exist():
+            return False
+        cache_mtime = os.path.getmtime(self.cache_path)
+        return max(os.path.getmtime(self.dem_path), os.path.getmtime(self.sea_mask_path)) > cache_mtime
+
+    def load(self):
+        """Memory-maps the cached grids, building them first if needed. Returns None if unavailable."""
+        if self._grids is not None:
+            return self._grids
+        if self._cache_is_stale():
+            if not self._sources_exist():
+                if not self._warned_missing:
+                    print(f"WARNING: No topography cache at {self.cache_path} and no DEM/sea mask to build it. "
+                          f"Using placeholder topographic features.")
+                    self._warned_missing = True
+                return None
+            build_topography_cache(self.dem_path, self.sea_mask_path, self.cache_path)
+        self._grids = np.load(self.cache_path, mmap_mode="r")
+        return self._grids
+
+    def lookup(self, center_coords: np.ndarray) -> np.ndarray:
+        """
+        Topographic variables under each (row, col) centre, as an (N, 5) float32
+        array ordered like settings.TOPOGRAPHIC_VARIABLES, gathered in one step.
+        """
+        center_coords = np.asarray(center_coords, dtype=np.int64).reshape(-1, 2)
+        grids = self.load()
+        if grids is None:
+            placeholder = np.array([PLACEHOLDER_TOPOGRAPHIC_FEATURES[v] for v in settings.TOPOGRAPHIC_VARIABLES], dtype=np.float32)
+            return np.tile(placeholder, (len(center_coords), 1))
+        rows = np.clip(center_coords[:, 0], 0, grids.shape[1] - 1)
+        cols = np.clip(center_coords[:, 1], 0, grids.shape[2] - 1)
+        return np.ascontiguousarray(grids[:, rows, cols].T)
+
+
+# Shared cache for the nowcasting cycle
+topography_cache = TopographyCache()
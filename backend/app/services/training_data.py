@@ -0,0 +1,238 @@
+# backend/app/services/training_data.py
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Iterator, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from app.config import settings
+from app.services.feature_store import COLUMNAR_EXTENSION, TARGET_COLUMNS, columnar_columns, iter_columnar_chunks
+
+# MCS type codes stored per row (-1 = unknown type)
+TRAINING_MCS_TYPES = list(dict.fromkeys(settings.MCS_TYPES + settings.MCS_TYPES_REGRESSION))
+
+
+class TrainingDataset:
+    """
+    Merged training rows staged on disk as raw float32/int8 arrays and read
+    back through memory maps: ``features`` (rows, n_features), ``targets``
+    (rows, len(TARGET_COLUMNS)) and ``mcs_codes`` (rows,), an index into
+    TRAINING_MCS_TYPES.
+
+    Only the staging directory and shape travel when a dataset is pickled to
+    a training worker; each process maps the files itself, so handing a
+    dataset to a process pool copies no row data.
+    """
+
+    def __init__(self, staging_dir: str, n_rows: int, feature_names: List[str]):
+        self.staging_dir = staging_dir
+        self.n_rows = n_rows
+        self.feature_names = list(feature_names)
+        self._maps = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_maps"] = {}
+        return state
+
+    def __len__(self):
+        return self.n_rows
+
+    def _map(self, name: str, dtype, width: Optional[int]) -> np.ndarray:
+        if name not in self._maps:
+            shape = (self.n_rows,) if width is None else (self.n_rows, width)
+            if self.n_rows == 0:
+                self._maps[name] = np.empty(shape, dtype=dtype)
+            else:
+                self._maps[name] = np.memmap(os.path.join(self.staging_dir, f"{name}.bin"), dtype=dtype, mode="r", shape=shape)
+        return self._maps[name]
+
+    @property
+    def features(self) -> np.ndarray:
+        return self._map("features", np.float32, len(self.feature_names))
+
+    @property
+    def targets(self) -> np.ndarray:
+        return self._map("targets", np.float32, len(TARGET_COLUMNS))
+
+    @property
+    def mcs_codes(self) -> np.ndarray:
+        return self._map("mcs_codes", np.int8, None)
+
+    def rows_for_mcs_type(self, mcs_type: str) -> np.ndarray:
+        """Row numbers of one MCS type, read from the code map in chunks."""
+        code = TRAINING_MCS_TYPES.index(mcs_type)
+        chunk_rows = settings.TRAINING_CHUNK_ROWS
+        return np.concatenate(
+            [np.flatnonzero(self.mcs_codes[start:start + chunk_rows] == code) + start
+             for start in range(0, self.n_rows, chunk_rows)] or [np.empty(0, dtype=np.int64)]
+        ).astype(np.int64)
+
+    @staticmethod
+    def _gather(array: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        # Reads the rows in file order (for locality) and returns them in the requested order
+        order = np.argsort(rows, kind="stable")
+        out = np.empty((len(rows),) + array.shape[1:], dtype=array.dtype)
+        out[order] = array[rows[order]]
+        return out
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """Feature rows, in the given order."""
+        return self._gather(self.features, rows)
+
+    def target(self, name: str, rows: np.ndarray) -> np.ndarray:
+        return self._gather(self.targets, rows)[:, TARGET_COLUMNS.index(name)]
+
+    def fingerprint(self, rows: np.ndarray, target: str) -> dict:
+        """
+        Fingerprint of one model key's training data: its row count and a
+        BLAKE2b hash of the feature names, feature rows and ``target`` values,
+        read chunk by chunk.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(",".join(self.feature_names + [target]).encode())
+        for chunk in self.iter_chunks(rows):
+            digest.update(np.ascontiguousarray(self.take(chunk)).tobytes())
+            digest.update(np.ascontiguousarray(self.target(target, chunk)).tobytes())
+        return {"rows": int(len(rows)), "content_hash": digest.hexdigest()}
+
+    def iter_chunks(self, rows: np.ndarray, chunk_rows: int = None) -> Iterator[np.ndarray]:
+        chunk_rows = chunk_rows or settings.TRAINING_CHUNK_ROWS
+        for start in range(0, len(rows), chunk_rows):
+            yield rows[start:start + chunk_rows]
+
+    def batches(self, rows: np.ndarray, target: str, batch_size: int, scaler=None, output_scaler=None,
+                shuffle: bool = False, seed: int = 0, channels: bool = False):
+        """
+        Generator of (X, y) float32 batches over ``rows``, standardized with the
+        given scalers. Only one batch is in memory at a time; with ``shuffle``
+        the row order is permuted on every call (i.e. every epoch).
+        """
+        if shuffle:
+            rows = np.random.default_rng(seed).permutation(rows)
+        for batch_rows in self.iter_chunks(rows, batch_size):
+            X = self.take(batch_rows)
+            y = self.target(target, batch_rows).reshape(-1, 1)
+            if scaler is not None:
+                X = ((X - scaler.mean_) / scaler.scale_).astype(np.float32)
+            if output_scaler is not None:
+                y = ((y - output_scaler.mean_) / output_scaler.scale_).astype(np.float32)
+            yield (X[:, :, None] if channels else X), y
+
+    def cleanup(self):
+        self._maps.clear()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+def _is_columnar(path: str) -> bool:
+    return path.endswith(COLUMNAR_EXTENSION)
+
+
+def _csv_columns(path: str) -> List[str]:
+    if _is_columnar(path):
+        return columnar_columns(path)
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def _read_chunks(path: str, columns: Sequence[str], float_columns: Sequence[str]) -> Iterator[pd.DataFrame]:
+    """
+    Reads only ``columns`` of a CSV, or of a memory-mapped Arrow IPC file from
+    the feature store, TRAINING_CHUNK_ROWS rows at a time, floats as float32.
+    """
+    dtype = {column: np.float32 for column in float_columns}
+    if _is_columnar(path):
+        for chunk in iter_columnar_chunks(path, list(columns), settings.TRAINING_CHUNK_ROWS):
+            yield chunk.astype(dtype)
+        return
+    yield from pd.read_csv(path, usecols=list(columns), dtype=dtype, chunksize=settings.TRAINING_CHUNK_ROWS)
+
+
+def _build_labels_index(labels_paths: List[str], mcs_type_column: Optional[str]) -> pd.DataFrame:
+    """Targets (float32) and optional MCS type of every labelled cell, indexed by cell_id."""
+    parts = []
+    for path in labels_paths:
+        available = _csv_columns(path)
+        columns = ['cell_id'] + [c for c in TARGET_COLUMNS if c in available]
+        if mcs_type_column and mcs_type_column in available:
+            columns.append(mcs_type_column)
+        for chunk in _read_chunks(path, columns, [c for c in TARGET_COLUMNS if c in available]):
+            parts.append(chunk.reindex(columns=['cell_id'] + TARGET_COLUMNS + ([mcs_type_column] if mcs_type_column else [])))
+    labels = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['cell_id'] + TARGET_COLUMNS)
+    labels[TARGET_COLUMNS] = labels[TARGET_COLUMNS].astype(np.float32)
+    return labels.set_index('cell_id')
+
+
+def load_training_dataset(radar_data_paths: List[str], labels_data_paths: List[str],
+                          staging_root: str = None) -> TrainingDataset:
+    """
+    Streams the radar CSVs (or their feature store copies) chunk by chunk, joins every chunk to the labels on
+    cell_id and appends the merged rows to on-disk staging files.
+
+    Only RADAR_VARIABLES, cell_id, the MCS type and the targets are parsed, as
+    float32, so peak memory is one radar chunk plus the labels index,
+    whatever the size of the radar files. Missing or infinite features are
+    filled with the column mean and missing or infinite targets with 0, in a
+    second pass over the staged features.
+    """
+    radar_columns = {path: _csv_columns(path) for path in radar_data_paths}
+    all_radar_columns = set().union(*radar_columns.values()) if radar_columns else set()
+    features = [f for f in settings.RADAR_VARIABLES if f in all_radar_columns]
+    missing_features = [f for f in settings.RADAR_VARIABLES if f not in all_radar_columns]
+    if missing_features:
+        print(f"WARNING: Missing features: {missing_features}")
+
+    # The MCS type comes from the radar data when it has one, else from the labels
+    radar_has_mcs_type = 'mcs_type' in all_radar_columns
+    labels_index = _build_labels_index(labels_data_paths, None if radar_has_mcs_type else 'mcs_type')
+    print(f"Labels index: {len(labels_index)} rows")
+
+    if staging_root:
+        os.makedirs(staging_root, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix="training_data_", dir=staging_root)
+    mcs_codes = {mcs_type: code for code, mcs_type in enumerate(TRAINING_MCS_TYPES)}
+    n_rows = 0
+    feature_sum = np.zeros(len(features), dtype=np.float64)
+    feature_count = np.zeros(len(features), dtype=np.int64)
+
+    with open(os.path.join(staging_dir, "features.bin"), "wb") as features_file, \
+            open(os.path.join(staging_dir, "targets.bin"), "wb") as targets_file, \
+            open(os.path.join(staging_dir, "mcs_codes.bin"), "wb") as codes_file:
+        for path in radar_data_paths:
+            columns = ['cell_id'] + [f for f in features if f in radar_columns[path]]
+            if radar_has_mcs_type and 'mcs_type' in radar_columns[path]:
+                columns.append('mcs_type')
+            for chunk in _read_chunks(path, columns, [f for f in features if f in radar_columns[path]]):
+                merged = chunk.join(labels_index, on='cell_id', how='inner')
+                if merged.empty:
+                    continue
+                X = merged.reindex(columns=features).to_numpy(dtype=np.float32)
+                X[~np.isfinite(X)] = np.nan
+                finite = ~np.isnan(X)
+                feature_sum += np.where(finite, X, 0.0).sum(axis=0, dtype=np.float64)
+                feature_count += finite.sum(axis=0)
+
+                y = merged[TARGET_COLUMNS].to_numpy(dtype=np.float32)
+                y[~np.isfinite(y)] = 0.0
+                mcs_type = merged['mcs_type'] if 'mcs_type' in merged.columns else pd.Series(index=merged.index, dtype=object)
+                codes = mcs_type.map(mcs_codes).fillna(-1).to_numpy(dtype=np.int8)
+
+                features_file.write(np.ascontiguousarray(X).tobytes())
+                targets_file.write(np.ascontiguousarray(y).tobytes())
+                codes_file.write(codes.tobytes())
+                n_rows += len(merged)
+
+    # Second pass: fill missing features with the column mean, in place
+    if n_rows:
+        means = np.divide(feature_sum, feature_count, out=np.zeros_like(feature_sum), where=feature_count > 0)
+        staged = np.memmap(os.path.join(staging_dir, "features.bin"), dtype=np.float32, mode="r+", shape=(n_rows, len(features)))
+        for start in range(0, n_rows, settings.TRAINING_CHUNK_ROWS):
+            block = staged[start:start + settings.TRAINING_CHUNK_ROWS]
+            missing = np.isnan(block)
+            if missing.any():
+                block[missing] = np.broadcast_to(means.astype(np.float32), block.shape)[missing]
+        staged.flush()
+        del staged
+
+    print(f"Merged training data: {n_rows} rows x {len(features)} features, staged in {staging_dir}")
+    return TrainingDataset(staging_dir, n_rows, features)
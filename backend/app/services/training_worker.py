@@ -0,0 +1,229 @@
+# backend/app/services/training_worker.py
+import asyncio
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Optional
+from bson import ObjectId
+from app.config import settings
+from app.database import training_status_collection
+
+# Seconds between checks of the progress queue (and of the worker being alive)
+_POLL_INTERVAL_S = 1.0
+
+
+def _exit_on_sigterm(signum, frame):
+    # Unwinds the stack instead of dying outright, so the training's finally blocks remove its staged files
+    raise SystemExit(128 + signum)
+
+
+def _training_process_main(radar_paths: List[str], labels_paths: List[str], progress_queue, full_retrain: bool = False,
+                           staging_root: str = None):
+    """Worker process: trains the models and reports progress events on ``progress_queue``."""
+    # Lead a new process group, so cancelling also stops the per-key training pool
+    if hasattr(os, "setsid"):
+        os.setsid()
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    from app.services.ml_service import MLModelService
+    try:
+        MLModelService().train_models(radar_paths, labels_paths, progress=progress_queue.put,
+                                      full_retrain=full_retrain, staging_root=staging_root)
+        progress_queue.put({"event": "completed"})
+    except Exception as e:
+        progress_queue.put({"event": "failed", "error": str(e)})
+
+
+def _staging_root() -> str:
+    return settings.TRAINING_STAGING_DIR or tempfile.gettempdir()
+
+
+def _job_staging_dir(training_id: str) -> str:
+    """Directory owned by one training job, under which its worker stages the training data."""
+    return os.path.join(_staging_root(), f"training_job_{training_id}")
+
+
+def _remove_stale_staging():
+    """
+    Removes the staged training data and artifacts of an earlier training
+    whose worker was killed before it could clean up. Only called while this
+    process holds the training slot, so nothing else is using them.
+    """
+    stale = [os.path.join(settings.ML_MODELS_DIR, ".staging")]
+    data_root = _staging_root()
+    if os.path.isdir(data_root):
+        stale += [os.path.join(data_root, name) for name in os.listdir(data_root)
+                  if name.startswith(("training_job_", "training_data_"))]
+    for path in stale:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"Removed stale training staging directory {path}")
+
+
+class TrainingJobManager:
+    """
+    Runs model training in a dedicated (spawned) worker process, so keras and
+    scikit-learn never block the API event loop, and streams the worker's
+    progress events into the training_status document.
+
+    Only one training runs at a time. The worker is not a daemon process,
+    since it runs the per-key grid on a process pool of its own; ``cancel()``
+    and ``shutdown()`` send SIGTERM to its whole process group. The worker
+    turns SIGTERM into SystemExit so its staged dataset is still removed.
+    Each job stages its data in a directory of its own, which is deleted
+    once the worker has exited however it ended; anything else a killed
+    process leaves behind is swept before the next training starts. Artifacts are written key by key, so models finished
+    before the cancellation are kept.
+
+    A request claims the slot with ``reserve()`` before any await, so a job
+    counts as running from then on, including while its inputs are still
+    being prepared and before its worker process exists.
+    """
+
+    def __init__(self):
+        self._process: Optional[multiprocessing.Process] = None
+        self._training_id: Optional[str] = None
+        self._reserved = False
+        self._cancelled = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._reserved or (self._process is not None and self._process.is_alive())
+
+    @property
+    def training_id(self) -> Optional[str]:
+        return self._training_id if self.is_running else None
+
+    def reserve(self, training_id: str):
+        """Claims the training slot for ``training_id``. Raises RuntimeError if a training is running."""
+        if self.is_running:
+            raise RuntimeError(f"Training {self._training_id} is already running.")
+        self._reserved = True
+        self._training_id = training_id
+        self._cancelled = False
+
+    def release(self):
+        """Frees a reserved slot whose training never started (e.g. its inputs failed to load)."""
+        if self._process is None:
+            self._reserved = False
+
+    async def run(self, training_id: str, radar_paths: List[str], labels_paths: List[str],
+                  full_retrain: bool = False) -> str:
+        """
+        Starts the worker and follows it until it exits. Returns the final
+        status: "completed", "failed" or "cancelled". Unless ``full_retrain``,
+        keys whose training data is unchanged are skipped.
+        """
+        if not (self._reserved and self._training_id == training_id):
+            self.reserve(training_id)
+        await asyncio.to_thread(_remove_stale_staging)
+        if self._cancelled:
+            # Cancelled while its inputs were being prepared
+            await training_status_collection.update_one({"_id": ObjectId(training_id)}, {"$set": {
+                "status": "cancelled", "completed_at": datetime.utcnow()}})
+            print(f"Training {training_id} cancelled before it started.")
+            self._reserved = False
+            return "cancelled"
+
+        context = multiprocessing.get_context("spawn")
+        progress_queue = context.Queue()
+        self._process = context.Process(
+            target=_training_process_main,
+            args=(radar_paths, labels_paths, progress_queue, full_retrain, _job_staging_dir(training_id)),
+            name=f"training-{training_id}", daemon=False,
+        )
+        try:
+            self._process.start()
+        except Exception:
+            self._process, self._reserved = None, False
+            raise
+        print(f"Training {training_id} started in worker process {self._process.pid}.")
+        try:
+            return await self._follow(training_id, progress_queue)
+        finally:
+            # The job's staged data goes with it, even if the worker crashed or was killed before cleaning up
+            if not self._process.is_alive():
+                shutil.rmtree(_job_staging_dir(training_id), ignore_errors=True)
+            self._process, self._reserved = None, False
+
+    async def _follow(self, training_id: str, progress_queue) -> str:
+        started = time.perf_counter()
+        final_status, error_message = None, None
+        while final_status is None:
+            try:
+                event = await asyncio.to_thread(progress_queue.get, True, _POLL_INTERVAL_S)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    if self._cancelled:
+                        final_status = "cancelled"
+                    else:
+                        final_status = "failed"
+                        error_message = f"Training worker exited unexpectedly (exit code {self._process.exitcode})."
+                continue
+
+            if event["event"] in ("completed", "failed"):
+                final_status = event["event"]
+                error_message = event.get("error")
+            else:
+                await self._record_progress(training_id, event, time.perf_counter() - started)
+
+        self._process.join(timeout=5)
+        update = {"status": final_status, "completed_at": datetime.utcnow(),
+                  "progress.elapsed_s": round(time.perf_counter() - started, 2)}
+        if error_message:
+            update["error_message"] = error_message
+        await training_status_collection.update_one({"_id": ObjectId(training_id)}, {"$set": update})
+        print(f"Training {training_id} {final_status}.")
+        return final_status
+
+    async def _record_progress(self, training_id: str, event: dict, elapsed_s: float):
+        update = {"$set": {"progress.elapsed_s": round(elapsed_s, 2), "progress.updated_at": datetime.utcnow()}}
+        if event["event"] == "model_started":
+            update["$set"].update({"progress.current_model": event["model_key"], "progress.epoch": None,
+                                   "progress.epochs": None, "progress.loss": None, "progress.val_loss": None})
+        elif event["event"] == "epoch":
+            update["$set"].update({
+                "progress.current_model": event["model_key"], "progress.epoch": event["epoch"],
+                "progress.epochs": event["epochs"], "progress.loss": event["loss"],
+                "progress.val_loss": event["val_loss"], "progress.model_elapsed_s": event["elapsed_s"],
+            })
+        elif event["event"] == "model_finished":
+            update["$push"] = {"progress.models_completed": {
+                "model_key": event["model_key"], "elapsed_s": event["elapsed_s"], "finished_at": datetime.utcnow()
+            }}
+        elif event["event"] == "model_skipped":
+            update["$push"] = {"progress.models_skipped": event["model_key"]}
+        try:
+            await training_status_collection.update_one({"_id": ObjectId(training_id)}, update)
+        except Exception as e:
+            print(f"Could not record training progress: {e}")
+
+    def _terminate(self):
+        try:
+            os.killpg(self._process.pid, signal.SIGTERM)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            # No process groups (Windows), or the worker has not called setsid() yet
+            self._process.terminate()
+
+    def cancel(self) -> bool:
+        """Terminates the running training and its pool. Returns False if none is running."""
+        if not self.is_running:
+            return False
+        self._cancelled = True
+        if self._process is not None and self._process.is_alive():
+            self._terminate()
+        print(f"Training {self._training_id} cancellation requested.")
+        return True
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stops a running training at application shutdown."""
+        if self.cancel() and self._process is not None:
+            self._process.join(timeout)
+
+
+# Shared manager for the training API
+training_manager = TrainingJobManager()
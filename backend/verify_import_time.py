@@ -0,0 +1,88 @@
+"""
+Verify API Import Time
+
+Imports the API (app.main by default) in a fresh interpreter, reports the
+wall time and the slowest modules, and fails if the import exceeds the time
+budget or pulls in the heavy ML stack (TensorFlow, scikit-learn), which must
+only be imported when a model is first used.
+
+Usage:
+    python verify_import_time.py [--module app.main] [--budget-seconds 2.0]
+
+Set API_ONLY_MODE=true to check the configuration of API-only workers.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must not be imported by the API at startup
+HEAVY_MODULES = ["tensorflow", "keras", "sklearn", "torch"]
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print("RESULT", elapsed, ",".join(heavy))
+"""
+
+
+def parse_importtime(stderr, top=15):
+    """Slowest modules by cumulative import time, from python -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():  # skips the header line
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def verify_import_time(module, budget_seconds):
+    print("=" * 60)
+    print(f"⏱️  IMPORT TIME CHECK: {module}")
+    print("=" * 60)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    result_lines = [line for line in result.stdout.splitlines() if line.startswith("RESULT")]
+    if result.returncode != 0 or not result_lines:
+        print(f"❌ Importing {module} failed:")
+        print(result.stderr.splitlines()[-1] if result.stderr else result.stdout)
+        return False
+
+    _, elapsed, heavy = (result_lines[-1].split(" ") + [""])[:3]
+    elapsed = float(elapsed)
+
+    print("Slowest imports (cumulative):")
+    for cumulative_us, name in parse_importtime(result.stderr):
+        print(f"  {cumulative_us / 1e6:7.3f} s  {name}")
+    print()
+    print(f"Import time: {elapsed:.3f} s (budget {budget_seconds:.3f} s)")
+
+    ok = True
+    if heavy:
+        print(f"❌ Heavy ML modules imported at startup: {heavy}")
+        ok = False
+    if elapsed > budget_seconds:
+        print("❌ Import time over budget")
+        ok = False
+    if ok:
+        print("✅ Import time within budget and no heavy ML modules imported")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-seconds", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_S", "2.0")))
+    args = parser.parse_args()
+    sys.exit(0 if verify_import_time(args.module, args.budget_seconds) else 1)